@@ -1,62 +1,547 @@
 import os
+import sys
 import time
 import math
 import re
+import csv
 import json
-from flask import Flask, render_template, request
+import html
+import gzip
+import random
+import uuid
+import hashlib
+import sqlite3
+import gc
+import threading
+import functools
+import multiprocessing
+import resource
+import tracemalloc
+import contextvars
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from contextlib import contextmanager
+import click
+from flask import Flask, render_template, request, g, jsonify
 import requests
 from urllib.parse import quote_plus, urlparse, urljoin
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-from googlesearch import search
 from requests.exceptions import ReadTimeout, Timeout, RequestException
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
+DATA_DIR = os.getenv("DATA_DIR", "data")
 
 app = Flask(__name__)
 
 # ===========================
 # Tiny in-memory TTL cache
 # ===========================
+# Backed by an optional SQLite tier (CACHE_DB_PATH, "" to disable) shared by
+# all workers and CLI commands, so offline jobs can fill it for the web app;
+# a memory hit is checked against the disk row's timestamp and the newer wins.
+# Entries older than CACHE_TTL_SEC (soft) but younger than CACHE_HARD_TTL_SEC
+# are served stale to callers that pass `refresh`, which then runs once per
+# key in the background; past the hard TTL the caller blocks as before.
 _CACHE = {}
 CACHE_TTL_SEC = 6 * 60 * 60
+CACHE_HARD_TTL_SEC = int(os.getenv("CACHE_HARD_TTL_SEC", str(48 * 60 * 60)))
 CACHE_MAX_KEYS = 1000
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(DATA_DIR, "cache.sqlite"))
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))
 
-def _cache_get(key):
+_cache_local = threading.local()
+
+
+def _cache_db():
+    if not CACHE_DB_PATH:
+        return None
+    conn = getattr(_cache_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_DB_PATH) or '.', exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB_PATH, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, val TEXT, ts REAL)")
+        _cache_local.conn = conn
+    return conn
+
+
+def _cache_disk_get(key):
+    try:
+        db = _cache_db()
+        row = db.execute("SELECT val, ts FROM cache WHERE key = ?", (key,)).fetchone() if db else None
+        return (json.loads(row[0]), row[1]) if row else None
+    except (sqlite3.Error, ValueError):
+        return None
+
+
+def _cache_disk_ts(key):
+    try:
+        db = _cache_db()
+        row = db.execute("SELECT ts FROM cache WHERE key = ?", (key,)).fetchone() if db else None
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+
+def _cache_disk_set(key, val, ts):
+    try:
+        db = _cache_db()
+        if db is None:
+            return
+        with db:
+            db.execute("INSERT OR REPLACE INTO cache VALUES (?,?,?)", (key, json.dumps(val), ts))
+            if random.random() < 0.002:
+                db.execute("DELETE FROM cache WHERE ts < ?", (ts - CACHE_HARD_TTL_SEC,))
+    except (sqlite3.Error, TypeError, ValueError):
+        pass
+
+
+def _cache_age(key):
+    """Seconds since key was cached (memory or disk tier), or None if absent."""
+    v = _CACHE.get(key) or _cache_disk_get(key)
+    return time.time() - v[1] if v else None
+
+
+_REFRESH_POOL = None
+_REFRESHING = set()
+_REFRESH_LOCK = threading.Lock()
+
+
+def _schedule_refresh(key, refresh):
+    """Run refresh() in the background unless one is already running for key."""
+    global _REFRESH_POOL
+    with _REFRESH_LOCK:
+        if key in _REFRESHING:
+            return
+        _REFRESHING.add(key)
+        if _REFRESH_POOL is None:
+            _REFRESH_POOL = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="refresh")
+
+    def run():
+        try:
+            refresh()
+        except Exception:
+            pass
+        finally:
+            with _REFRESH_LOCK:
+                _REFRESHING.discard(key)
+    _REFRESH_POOL.submit(run)
+
+
+def _cache_get(key, refresh=None):
     v = _CACHE.get(key)
+    if v:
+        # another process (a CLI job, another worker) may have written a newer entry
+        ts = _cache_disk_ts(key)
+        if ts is not None and ts > v[1]:
+            v = None
     if not v:
+        v = _cache_disk_get(key)
+        if v:
+            _CACHE[key] = v
+    if not v:
+        _count_cache(key, False)
         return None
     val, ts = v
-    if time.time() - ts > CACHE_TTL_SEC:
-        _CACHE.pop(key, None)
-        return None
+    age = time.time() - ts
+    if age > CACHE_TTL_SEC:
+        if refresh is None or age > CACHE_HARD_TTL_SEC:
+            _CACHE.pop(key, None)
+            _count_cache(key, False)
+            return None
+        _schedule_refresh(key, refresh)
+    _count_cache(key, True, age)
     return val
 
-def _cache_set(key, val):
+def _cache_set(key, val, ts=None):
+    """Cache val under key; `ts` backdates the entry (e.g. to when its source was fetched)."""
     try:
         if len(_CACHE) > CACHE_MAX_KEYS:
             for k, _ in list(sorted(_CACHE.items(), key=lambda kv: kv[1][1]))[: max(1, CACHE_MAX_KEYS // 10)]:
                 _CACHE.pop(k, None)
-        _CACHE[key] = (val, time.time())
+        ts = time.time() if ts is None else ts
+        _CACHE[key] = (val, ts)
+        _cache_disk_set(key, val, ts)
     except Exception:
         pass
 
 
+# ===================================
+# Per-request resource accounting
+# ===================================
+# Each evaluation gets a _RequestStats in a context variable; upstream calls,
+# cache lookups, Chrome renders and parsing add to it (worker threads inherit
+# it through _in_context) and one JSON line is appended to REQUEST_LOG_PATH.
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", os.path.join("logs", "requests.jsonl"))
+REQUEST_LOG_TRACEMALLOC = os.getenv("REQUEST_LOG_TRACEMALLOC", "0").strip() == "1"
+if REQUEST_LOG_TRACEMALLOC:
+    tracemalloc.start()
+
+_REQ_STATS = contextvars.ContextVar("_REQ_STATS", default=None)
+_REQUEST_LOG_LOCK = threading.Lock()
+
+
+class _RequestStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.calls = Counter()          # host -> upstream requests
+        self.bytes = 0
+        self.google_calls = Counter()   # billed Maps endpoint -> calls
+        self.chrome_launches = 0
+        self.render_sec = 0.0
+        self.parse_cpu_sec = 0.0
+        self.cache = defaultdict(Counter)  # key prefix -> {'hit': n, 'miss': n, 'stale': n}
+        self.data_age = {}                 # key prefix -> oldest cached value served (sec)
+        self.stages = {}
+        self.meta = {}
+        self.rss_kb_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if REQUEST_LOG_TRACEMALLOC:
+            tracemalloc.reset_peak()
+            self.traced_start = tracemalloc.get_traced_memory()[0]
+
+    def record(self):
+        rec = {
+            'ts': round(self.started, 3),
+            'total_sec': round(time.perf_counter() - self.t0, 3),
+            **self.meta,
+            'stages': {k: round(v, 3) for k, v in self.stages.items()},
+            'calls': dict(self.calls),
+            'bytes': self.bytes,
+            'google_calls': dict(self.google_calls),
+            'google_calls_total': sum(self.google_calls.values()),
+            'chrome_launches': self.chrome_launches,
+            'render_sec': round(self.render_sec, 3),
+            'parse_cpu_sec': round(self.parse_cpu_sec, 3),
+            'cache': {k: dict(v) for k, v in self.cache.items()},
+            'data_age_sec': {k: round(v) for k, v in self.data_age.items()},
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'peak_rss_delta_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - self.rss_kb_start,
+        }
+        if REQUEST_LOG_TRACEMALLOC:
+            rec['tracemalloc_peak_delta_kb'] = (tracemalloc.get_traced_memory()[1] - self.traced_start) // 1024
+        return rec
+
+
+def _stats():
+    return _REQ_STATS.get()
+
+
+def _in_context(fn):
+    """Wrap fn so it runs in (a copy of) the caller's context, e.g. in a worker thread."""
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def _count_call(url, nbytes=0):
+    st = _stats()
+    if st is None:
+        return
+    parts = urlparse(url)
+    host = parts.netloc.lower()
+    with st.lock:
+        st.calls[host] += 1
+        st.bytes += nbytes
+        if host == "maps.googleapis.com":
+            st.google_calls[parts.path.replace("/maps/api/", "").replace("/json", "")] += 1
+
+
+def _count_bytes(nbytes):
+    st = _stats()
+    if st is not None:
+        with st.lock:
+            st.bytes += nbytes
+
+
+def _count_cache(key, hit, age=None):
+    st = _stats()
+    if st is not None:
+        prefix = key.split(':', 1)[0]
+        with st.lock:
+            st.cache[prefix]['hit' if hit else 'miss'] += 1
+            # a miss is fetched live, i.e. age 0
+            st.data_age[prefix] = max(age or 0.0, st.data_age.get(prefix, 0.0))
+            if age is not None:
+                if age > CACHE_TTL_SEC:
+                    st.cache[prefix]['stale'] += 1
+
+
+def _count_render(seconds):
+    st = _stats()
+    if st is not None:
+        with st.lock:
+            st.chrome_launches += 1
+            st.render_sec += seconds
+
+
+def _count_parse(cpu_seconds):
+    st = _stats()
+    if st is not None:
+        with st.lock:
+            st.parse_cpu_sec += cpu_seconds
+
+
+@contextmanager
+def _parse_timer():
+    t0 = time.thread_time()
+    try:
+        yield
+    finally:
+        _count_parse(time.thread_time() - t0)
+
+
+def _timed_parse(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _parse_timer():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def _stage(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        st = _stats()
+        if st is not None:
+            with st.lock:
+                st.stages[name] = st.stages.get(name, 0.0) + time.perf_counter() - t0
+
+
+def _get(url, **kwargs):
+    """requests.get with accounting and a deadline-sized timeout; streamed bodies report bytes via _count_bytes."""
+    kwargs['timeout'] = _budget(kwargs.get('timeout') or UPSTREAM_TIMEOUT_SEC)
+    r = requests.get(url, **kwargs)
+    _count_call(url, 0 if kwargs.get('stream') else len(r.content))
+    return r
+
+
+def _web_search(query, num_results=3):
+    from googlesearch import search
+    timeout = _budget(5)
+    _count_call("https://www.google.com/search")
+    return list(search(query, num_results=num_results, timeout=timeout))
+
+
+def _write_request_log(rec):
+    try:
+        os.makedirs(os.path.dirname(REQUEST_LOG_PATH) or '.', exist_ok=True)
+        line = json.dumps(rec, separators=(',', ':'), default=str) + "\n"
+        with _REQUEST_LOG_LOCK, open(REQUEST_LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(line)
+    except OSError:
+        pass
+
+
+@app.before_request
+def _start_request_stats():
+    if request.method == 'POST' or request.endpoint == 'evaluate_api':
+        g.req_stats = _RequestStats()
+        g.req_stats_token = _REQ_STATS.set(g.req_stats)
+
+
+@app.teardown_request
+def _finish_request_stats(exc=None):
+    st = g.pop('req_stats', None)
+    if st is None:
+        return
+    try:
+        _REQ_STATS.reset(g.pop('req_stats_token'))
+    except (KeyError, ValueError):
+        pass
+    st.meta.setdefault('endpoint', request.endpoint)
+    if exc is not None:
+        st.meta['error'] = type(exc).__name__
+    _write_request_log(st.record())
+
+
+# ===================================
+# Request deadline
+# ===================================
+# An evaluation sets an absolute deadline (EVAL_SLA_SEC) in a context
+# variable; every upstream call sizes its timeout with _budget() and stages
+# that run out of time are reported as incomplete instead of failing the page.
+EVAL_SLA_SEC = float(os.getenv("EVAL_SLA_SEC", "60"))
+UPSTREAM_TIMEOUT_SEC = 15  # for calls that had no explicit timeout
+
+_DEADLINE = contextvars.ContextVar("_DEADLINE", default=None)
+
+
+class DeadlineExceeded(Timeout):
+    """The request's time budget is spent (a requests Timeout, so existing handlers catch it)."""
+
+
+def _time_left():
+    dl = _DEADLINE.get()
+    return None if dl is None else dl - time.monotonic()
+
+
+def _budget(timeout):
+    """timeout clamped to the time left before the request deadline."""
+    left = _time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request deadline passed")
+    return left if timeout is None else min(timeout, left)
+
+
+def _deadline_check():
+    """Raise DeadlineExceeded if the deadline has passed. Handlers that swallow
+    upstream errors call it first, so work cut short by the deadline is
+    neither cached nor reported as an (empty) result."""
+    left = _time_left()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("request deadline passed")
+
+
+def _detached(fn):
+    """_in_context without the deadline, for work that may outlive the request
+    (it finishes and caches its result for the next view)."""
+    def run(*args, **kwargs):
+        _DEADLINE.set(None)
+        return fn(*args, **kwargs)
+    return _in_context(run)
+
+
+# ===================================
+# Parse offload (CPU-bound HTML work)
+# ===================================
+# Fetch threads hand page bodies to a per-process parse pool so BeautifulSoup
+# and the rate/contact regexes use every core instead of serializing on the
+# GIL. PARSE_QUEUE_DEPTH bounds in-flight work: fetchers block rather than
+# queue unbounded megabytes. Small bodies and PARSE_WORKERS=0 parse inline;
+# on a free-threaded build a thread pool is used instead of processes.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str((os.cpu_count() or 1) // 2)))
+PARSE_QUEUE_DEPTH = int(os.getenv("PARSE_QUEUE_DEPTH", str(max(1, PARSE_WORKERS) * 4)))
+PARSE_OFFLOAD_MIN_BYTES = int(os.getenv("PARSE_OFFLOAD_MIN_BYTES", "32768"))
+
+_PARSE_POOL = None
+_PARSE_POOL_PID = None
+_PARSE_POOL_LOCK = threading.Lock()
+_PARSE_SLOTS = threading.BoundedSemaphore(PARSE_QUEUE_DEPTH)
+
+
+def _gil_enabled():
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def _parse_pool():
+    """The parse executor for this process (created lazily, never inherited across fork)."""
+    global _PARSE_POOL, _PARSE_POOL_PID
+    if PARSE_WORKERS <= 0:
+        return None
+    if _PARSE_POOL is not None and _PARSE_POOL_PID == os.getpid():
+        return _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None or _PARSE_POOL_PID != os.getpid():
+            if not _gil_enabled():
+                _PARSE_POOL = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="parse")
+            else:
+                # forkserver: children never inherit the web worker's threads or sockets.
+                ctx = multiprocessing.get_context("forkserver" if sys.platform.startswith("linux") else "spawn")
+                _PARSE_POOL = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=ctx)
+            _PARSE_POOL_PID = os.getpid()
+    return _PARSE_POOL
+
+
+def _run_parse(fn, *args):
+    t0 = time.thread_time()
+    result = fn(*args)
+    return result, time.thread_time() - t0
+
+
+def _offload_parse(fn, *args):
+    """Run a module-level parse function on the parse pool and return its result."""
+    size = sum(len(a) for a in args if isinstance(a, (str, bytes)))
+    pool = _parse_pool() if size >= PARSE_OFFLOAD_MIN_BYTES else None
+    if pool is None:
+        return fn(*args)
+    with _PARSE_SLOTS:
+        try:
+            result, cpu = pool.submit(_run_parse, fn, *args).result()
+        except BrokenProcessPool:
+            global _PARSE_POOL
+            _PARSE_POOL = None
+            return fn(*args)
+    _count_parse(cpu)
+    return result
+
+
+# ===================================
+# Startup: lazy heavy imports, preload
+# ===================================
+# bs4, googlesearch, selenium and pyarrow are imported on first use so the
+# module (and CLI commands) load fast. Under gunicorn's preload_app the master
+# calls warm_shared_state() once before forking: heavy modules and read-only
+# tables are built there and frozen out of the GC so workers share them
+# copy-on-write. Connections, pools and locks are reset in each child.
+def _soup(markup):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(markup, 'html.parser')
+
+
+def warm_shared_state():
+    """Import heavy modules and build read-only tables in the pre-fork master."""
+    t0 = time.perf_counter()
+    import bs4  # noqa: F401
+    import googlesearch  # noqa: F401
+    _soup("<html><head><title>warm</title></head></html>")  # loads the parser builder
+    _have_selenium()
+    if RATE_HISTORY:
+        try:
+            import pyarrow.dataset  # noqa: F401
+        except ImportError:
+            pass
+    # Nothing allocated so far is garbage; keep the collector from touching
+    # (and un-sharing) those pages in every worker.
+    gc.collect()
+    gc.freeze()
+    return time.perf_counter() - t0
+
+
+def _reset_after_fork():
+    """Per-process state must never be inherited: SQLite handles, pools, locks."""
+    global _cache_local, _cad_local, _entity_local, _listings_local, _snapshot_local
+    global _REFRESH_POOL, _REFRESHING, _REFRESH_LOCK, _PARSE_POOL, _PARSE_POOL_LOCK, _PARSE_SLOTS
+    global _REQUEST_LOG_LOCK
+    _cache_local = threading.local()
+    _cad_local = threading.local()
+    _entity_local = threading.local()
+    _listings_local = threading.local()
+    _snapshot_local = threading.local()
+    _REFRESH_POOL, _REFRESHING, _REFRESH_LOCK = None, set(), threading.Lock()
+    _PARSE_POOL, _PARSE_POOL_LOCK = None, threading.Lock()
+    _PARSE_SLOTS = threading.BoundedSemaphore(PARSE_QUEUE_DEPTH)
+    _REQUEST_LOG_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: _reset_after_fork())
+
+
 # ====================================
 # 1) CAD Scrapers for Texas districts
 # ====================================
 def tarrant_cad(address):
     url = f"https://www.tad.org/property-search-results/?searchtext={quote_plus(address)}"
-    html = requests.get(url, timeout=10).text
-    soup = BeautifulSoup(html, 'html.parser')
+    html = _get(url, timeout=10).text
+    soup = _soup(html)
     link = soup.select_one('a.property-listing')
     if not link:
         return {}
     detail_url = "https://www.tad.org" + link['href']
-    detail_html = requests.get(detail_url, timeout=10).text
-    dsoup = BeautifulSoup(detail_html, 'html.parser')
+    detail_html = _get(detail_url, timeout=10).text
+    dsoup = _soup(detail_html)
     owner = dsoup.find('h4', text='Owner')
     tax   = dsoup.find('h4', text='Account #')
     mail  = dsoup.find('h4', text='Mailing Address')
@@ -68,8 +553,8 @@ def tarrant_cad(address):
 
 def dallas_cad(address):
     url = f"https://www.dallascad.org/SearchOwner.aspx?searchTerm={quote_plus(address)}"
-    html = requests.get(url, timeout=10).text
-    soup = BeautifulSoup(html, 'html.parser')
+    html = _get(url, timeout=10).text
+    soup = _soup(html)
     table = soup.find('table', id='Grid')
     if not table or len(table.find_all('tr')) < 2:
         return {}
@@ -93,6 +578,9 @@ cad_modules = {
 }
 
 def get_cad_details(county, state, address):
+    rec = cad_roll_lookup(county, address)
+    if rec:
+        return rec
     func = cad_modules.get(county.lower())
     if func:
         data = func(address)
@@ -102,30 +590,439 @@ def get_cad_details(county, state, address):
     return {'link': f"https://www.google.com/search?q={query}"}
 
 
+# ==============================================
+# 1b) Local certified-roll store (bulk CAD data)
+# ==============================================
+# Texas appraisal districts publish their certified rolls as bulk exports.
+# `flask cad-ingest` loads them into SQLite with an FTS5 index on the
+# normalized situs address so owner/tax lookups are answered offline.
+CAD_DB_PATH = os.getenv("CAD_DB_PATH", os.path.join(DATA_DIR, "cad_roll.sqlite"))
+
+# Header-based layouts of the published exports. Each field maps to one or
+# more columns (joined with a space); override per load with --map. The
+# Tarrant, Dallas and Harris appraisal exports carry values but no levy
+# ('tax': ()), so get_tax_history stays empty for those counties unless a
+# file with a levy column is loaded with --map tax=COL.
+CAD_ROLL_LAYOUTS = {
+    'tarrant': {
+        'delimiter': '|',
+        'account': ('Account_Num',),
+        'owner_name': ('Owner_Name',),
+        'mailing_address': ('Owner_Address', 'Owner_CityState', 'Owner_Zip'),
+        'situs': ('Situs_Address',),
+        'market_value': ('Total_Value',),
+        'tax': (),
+    },
+    'dallas': {
+        'delimiter': ',',
+        'account': ('ACCOUNT_NUM',),
+        'owner_name': ('OWNER_NAME1',),
+        'mailing_address': ('OWNER_ADDRESS_LINE1', 'OWNER_CITY', 'OWNER_STATE', 'OWNER_ZIPCODE'),
+        'situs': ('STREET_NUM', 'FULL_STREET_NAME'),
+        'market_value': ('TOT_VAL',),
+        'tax': (),
+    },
+    'harris': {
+        'delimiter': '\t',
+        'account': ('acct',),
+        'owner_name': ('mailto',),
+        'mailing_address': ('mail_addr_1', 'mail_city', 'mail_state', 'mail_zip'),
+        'situs': ('site_addr_1',),
+        'market_value': ('tot_mkt_val',),
+        'tax': (),
+    },
+    'bexar': {
+        'delimiter': ',',
+        'account': ('prop_id',),
+        'owner_name': ('py_owner_name',),
+        'mailing_address': ('py_addr_line1', 'py_addr_city', 'py_addr_state', 'py_addr_zip'),
+        'situs': ('situs_num', 'situs_street_prefx', 'situs_street', 'situs_street_sufix'),
+        'market_value': ('market_value',),
+        'tax': ('total_tax',),
+    },
+    'travis': {
+        'delimiter': ',',
+        'account': ('prop_id',),
+        'owner_name': ('py_owner_name',),
+        'mailing_address': ('py_addr_line1', 'py_addr_city', 'py_addr_state', 'py_addr_zip'),
+        'situs': ('situs_num', 'situs_street_prefx', 'situs_street', 'situs_street_sufix'),
+        'market_value': ('market_value',),
+        'tax': ('total_tax',),
+    },
+}
+
+_ADDR_ABBREV = {
+    'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR',
+    'BOULEVARD': 'BLVD', 'LANE': 'LN', 'HIGHWAY': 'HWY', 'PARKWAY': 'PKWY',
+    'FREEWAY': 'FWY', 'EXPRESSWAY': 'EXPY', 'COURT': 'CT', 'CIRCLE': 'CIR',
+    'PLACE': 'PL', 'TRAIL': 'TRL', 'TERRACE': 'TER', 'SQUARE': 'SQ', 'LOOP': 'LOOP',
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+}
+_ADDR_PUNCT = re.compile(r'[^A-Z0-9 ]+')
+
+_CAD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roll (
+    county TEXT NOT NULL, tax_year INTEGER NOT NULL, account TEXT NOT NULL,
+    owner_name TEXT, mailing_address TEXT, situs TEXT, situs_norm TEXT,
+    market_value REAL, tax REAL,
+    PRIMARY KEY (county, tax_year, account)
+);
+CREATE INDEX IF NOT EXISTS roll_account ON roll (county, account);
+CREATE VIRTUAL TABLE IF NOT EXISTS roll_fts USING fts5(situs_norm, content='roll', content_rowid='rowid');
+CREATE TRIGGER IF NOT EXISTS roll_ai AFTER INSERT ON roll BEGIN
+    INSERT INTO roll_fts(rowid, situs_norm) VALUES (new.rowid, new.situs_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS roll_ad AFTER DELETE ON roll BEGIN
+    INSERT INTO roll_fts(roll_fts, rowid, situs_norm) VALUES ('delete', old.rowid, old.situs_norm);
+END;
+CREATE TABLE IF NOT EXISTS roll_loads (
+    county TEXT NOT NULL, tax_year INTEGER NOT NULL, source_sha1 TEXT,
+    rows INTEGER, loaded_at REAL,
+    PRIMARY KEY (county, tax_year)
+);
+"""
+
+_cad_local = threading.local()
+
+
+def _norm_address(address):
+    """Street part of an address, upper-cased with USPS-style abbreviations."""
+    if not address:
+        return ""
+    street = address.split(',')[0].upper()
+    toks = _ADDR_PUNCT.sub(' ', street).split()
+    return " ".join(_ADDR_ABBREV.get(t, t) for t in toks)
+
+
+def _cad_db():
+    """Per-thread read-only connection to the roll store, or None if not loaded."""
+    conn = getattr(_cad_local, 'conn', None)
+    if conn is not None:
+        return conn
+    if not os.path.exists(CAD_DB_PATH):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{CAD_DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+    except sqlite3.Error:
+        return None
+    _cad_local.conn = conn
+    return conn
+
+
+_ADDR_DIRECTIONS = {'N', 'S', 'E', 'W', 'NE', 'NW', 'SE', 'SW'}
+
+
+def _cad_roll_match(county, address):
+    """Roll row (latest tax year) whose situs has the address's house number and
+    street, or None.
+
+    The situs must start with the whole normalized address (the roll may add a
+    unit) or equal a leading part of it that still includes the street name
+    (the query may add a unit or suffix). Several parcels at the same level
+    are ambiguous and count as a miss.
+    """
+    db = _cad_db()
+    toks = _norm_address(address).split()
+    if db is None or len(toks) < 2:
+        return None
+    min_n = 3 if toks[1] in _ADDR_DIRECTIONS else 2  # number [+ direction] + street name
+    for n in range(len(toks), min_n - 1, -1):
+        prefix = " ".join(toks[:n])
+        try:
+            rows = db.execute(
+                "SELECT r.* FROM roll_fts JOIN roll r ON r.rowid = roll_fts.rowid "
+                "WHERE roll_fts MATCH ? AND r.county = ? ORDER BY r.tax_year DESC LIMIT 50",
+                (f'situs_norm:^"{prefix}"', county.lower())
+            ).fetchall()
+        except sqlite3.Error:
+            return None
+        exact = [r for r in rows if r['situs_norm'] == prefix]
+        if n < len(toks):
+            rows = exact
+        rows = exact or rows
+        if rows:
+            return rows[0] if len({r['account'] for r in rows}) == 1 else None
+    return None
+
+
+def cad_roll_lookup(county, address):
+    """Owner/account record from the local roll store, or {} on a miss."""
+    row = _cad_roll_match(county, address) if county else None
+    if row is None:
+        return {}
+    return {
+        'owner_name': row['owner_name'] or 'N/A',
+        'tax_id': row['account'],
+        'mailing_address': row['mailing_address'] or 'N/A',
+        'tax_year': row['tax_year'],
+        'source': 'roll'
+    }
+
+
+def _roll_value(v):
+    try:
+        return float(re.sub(r'[^\d.\-]', '', v)) if v else None
+    except ValueError:
+        return None
+
+
+def ingest_cad_roll(county, year, path, layout=None, force=False):
+    """Load one county/year export into the roll store.
+
+    Reloading a year replaces only that county/year's rows; an unchanged file
+    (same SHA-1) is skipped unless `force`. Returns the number of rows loaded.
+    """
+    county = county.lower()
+    layout = dict(CAD_ROLL_LAYOUTS.get(county, {}), **(layout or {}))
+    if not layout.get('account') or not layout.get('situs'):
+        raise click.UsageError(f"No roll layout for {county!r}; pass --map for account and situs.")
+
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    sha = h.hexdigest()
+
+    os.makedirs(os.path.dirname(CAD_DB_PATH) or '.', exist_ok=True)
+    db = sqlite3.connect(CAD_DB_PATH)
+    try:
+        db.executescript(_CAD_SCHEMA)
+        prev = db.execute("SELECT source_sha1 FROM roll_loads WHERE county = ? AND tax_year = ?",
+                          (county, year)).fetchone()
+        if prev and prev[0] == sha and not force:
+            return 0
+
+        def col(row, field):
+            return " ".join(row.get(c, '').strip() for c in layout.get(field, ()) if row.get(c, '').strip())
+
+        def rows():
+            with open(path, newline='', encoding='latin-1') as f:
+                for row in csv.DictReader(f, delimiter=layout.get('delimiter') or ','):
+                    acct = col(row, 'account')
+                    if not acct:
+                        continue
+                    situs = col(row, 'situs')
+                    yield (county, year, acct, col(row, 'owner_name'), col(row, 'mailing_address'),
+                           situs, _norm_address(situs),
+                           _roll_value(col(row, 'market_value')), _roll_value(col(row, 'tax')))
+
+        n = 0
+        with db:
+            db.execute("DELETE FROM roll WHERE county = ? AND tax_year = ?", (county, year))
+            batch = []
+            for r in rows():
+                batch.append(r)
+                if len(batch) >= 10_000:
+                    db.executemany("INSERT OR IGNORE INTO roll VALUES (?,?,?,?,?,?,?,?,?)", batch)
+                    n += len(batch)
+                    batch = []
+            if batch:
+                db.executemany("INSERT OR IGNORE INTO roll VALUES (?,?,?,?,?,?,?,?,?)", batch)
+                n += len(batch)
+            db.execute("INSERT OR REPLACE INTO roll_loads VALUES (?,?,?,?,?)",
+                       (county, year, sha, n, time.time()))
+        db.execute("INSERT INTO roll_fts(roll_fts) VALUES ('optimize')")
+        return n
+    finally:
+        db.close()
+
+
 # =========================
 # 2) LLC & Owner stubs
 # =========================
-def get_llc_info(owner_name):
-    if not owner_name:
-        return {}
+# Persistent owner-name -> company index. OpenCorporates is only queried for
+# names with no fresh fuzzy match locally; every company a search returns is
+# indexed, so sponsor/REIT names repeated across a portfolio resolve offline.
+# A fuzzy hit for a name that was never searched must carry the same fund
+# numbers/ordinals ("FUND II" is not "FUND III"), otherwise it is searched.
+ENTITY_DB_PATH = os.getenv("ENTITY_DB_PATH", os.path.join(DATA_DIR, "entities.sqlite"))
+ENTITY_TTL_SEC = int(os.getenv("ENTITY_TTL_SEC", str(30 * 24 * 60 * 60)))
+ENTITY_MATCH_MIN = float(os.getenv("ENTITY_MATCH_MIN", "0.6"))
+ENTITY_SUFFIXES = {'LLC', 'INC', 'INCORPORATED', 'CORP', 'CORPORATION', 'CO', 'COMPANY',
+                   'LP', 'LLP', 'PLLC', 'LTD', 'LIMITED', 'TRUST', 'PARTNERSHIP'}
+
+_ENTITY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    jurisdiction TEXT NOT NULL, company_number TEXT NOT NULL,
+    name TEXT, name_norm TEXT, incorporation_date TEXT, opencorporates_url TEXT,
+    fetched_at REAL,
+    PRIMARY KEY (jurisdiction, company_number)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entities_fts USING fts5(name_norm, content='entities', content_rowid='rowid', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS entities_ai AFTER INSERT ON entities BEGIN
+    INSERT INTO entities_fts(rowid, name_norm) VALUES (new.rowid, new.name_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS entities_au AFTER UPDATE ON entities BEGIN
+    INSERT INTO entities_fts(entities_fts, rowid, name_norm) VALUES ('delete', old.rowid, old.name_norm);
+    INSERT INTO entities_fts(rowid, name_norm) VALUES (new.rowid, new.name_norm);
+END;
+CREATE TABLE IF NOT EXISTS entity_lookups (
+    query_norm TEXT PRIMARY KEY, hits INTEGER, fetched_at REAL
+);
+"""
+
+_entity_local = threading.local()
+
+
+def _norm_entity(name):
+    """Upper-cased owner name without punctuation or trailing entity suffixes."""
+    if not name:
+        return ""
+    s = name.upper().replace('&', ' AND ').replace('.', '')
+    toks = _ADDR_PUNCT.sub(' ', s).split()
+    if toks and toks[0] == 'THE':
+        toks = toks[1:]
+    while len(toks) > 1 and toks[-1] in ENTITY_SUFFIXES:
+        toks.pop()
+    return " ".join(toks)
+
+
+_ENTITY_ORDINAL_WORDS = {'FIRST', 'SECOND', 'THIRD', 'FOURTH', 'FIFTH', 'SIXTH', 'SEVENTH',
+                         'EIGHTH', 'NINTH', 'TENTH'}
+_ENTITY_NUMBER_RE = re.compile(r'^(\d+(ST|ND|RD|TH)?|X{0,3}(IX|IV|V?I{0,3}))$')
+
+
+def _entity_numbers(norm):
+    """Numeric, ordinal and roman-numeral tokens of a normalized name."""
+    return sorted(t for t in norm.split() if t in _ENTITY_ORDINAL_WORDS or _ENTITY_NUMBER_RE.match(t))
+
+
+def _trigrams(s):
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _name_similarity(a, b):
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+def _entity_db():
+    conn = getattr(_entity_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(ENTITY_DB_PATH) or '.', exist_ok=True)
+        conn = sqlite3.connect(ENTITY_DB_PATH, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_ENTITY_SCHEMA)
+        _entity_local.conn = conn
+    return conn
+
+
+def _entity_best_match(db, norm):
+    """(row, score) of the closest fresh indexed company, or (None, 0)."""
+    tris = [t for t in _trigrams(norm) if t.strip() and '"' not in t]
+    if not tris:
+        return None, 0.0
+    rows = db.execute(
+        "SELECT e.* FROM entities_fts JOIN entities e ON e.rowid = entities_fts.rowid "
+        "WHERE entities_fts MATCH ? AND e.fetched_at > ? ORDER BY rank LIMIT 50",
+        (" OR ".join(f'"{t}"' for t in tris), time.time() - ENTITY_TTL_SEC)
+    ).fetchall()
+    best, score = None, 0.0
+    for r in rows:
+        sc = _name_similarity(norm, r['name_norm'])
+        if sc > score:
+            best, score = r, sc
+    return best, score
+
+
+def _fetch_companies(owner_name):
+    """OpenCorporates search; list of company dicts, or None if the call failed."""
     try:
-        oc = requests.get(
+        oc = _get(
             "https://api.opencorporates.com/v0.4/companies/search",
-            params={'q': owner_name, 'jurisdiction_code': 'us_tx'}
+            params={'q': owner_name, 'jurisdiction_code': 'us_tx'},
+            timeout=8
         ).json()
-        comps = oc.get('results', {}).get('companies', [])
-        if not comps:
-            return {}
-        comp = comps[0]['company']
-        num = comp.get('company_number')
-        return {
-            'llc_name': comp.get('name'),
-            'formation_date': comp.get('incorporation_date'),
-            'opencorporates_url': comp.get('opencorporates_url'),
-            'sos_url': f"https://mycpa.cpa.state.tx.us/coa/servlet/DisplayAAE?reportingEntityId={num}"
-        }
-    except:
+    except (RequestException, ValueError):
+        _deadline_check()
+        return None
+    return [c['company'] for c in oc.get('results', {}).get('companies', []) if c.get('company')]
+
+
+def _index_companies(db, norm, companies):
+    now = time.time()
+    with db:
+        db.executemany(
+            "INSERT INTO entities VALUES (?,?,?,?,?,?,?) "
+            "ON CONFLICT (jurisdiction, company_number) DO UPDATE SET name = excluded.name, "
+            "name_norm = excluded.name_norm, incorporation_date = excluded.incorporation_date, "
+            "opencorporates_url = excluded.opencorporates_url, fetched_at = excluded.fetched_at",
+            [(c.get('jurisdiction_code') or 'us_tx', str(c.get('company_number') or ''),
+              c.get('name'), _norm_entity(c.get('name')), c.get('incorporation_date'),
+              c.get('opencorporates_url'), now)
+             for c in companies if c.get('company_number')]
+        )
+        db.execute("INSERT OR REPLACE INTO entity_lookups VALUES (?,?,?)", (norm, len(companies), now))
+
+
+def _llc_record(row, score):
+    return {
+        'llc_name': row['name'],
+        'formation_date': row['incorporation_date'],
+        'opencorporates_url': row['opencorporates_url'],
+        'sos_url': f"https://mycpa.cpa.state.tx.us/coa/servlet/DisplayAAE?reportingEntityId={row['company_number']}",
+        'match_score': round(score, 2)
+    }
+
+
+def get_llc_info_batch(owner_names):
+    """Resolve many owner names at once; returns {owner_name: llc_info_or_{}}."""
+    names = {n: _norm_entity(n) for n in set(owner_names or []) if n and _norm_entity(n)}
+    if not names:
+        return {n: {} for n in (owner_names or [])}
+    try:
+        db = _entity_db()
+    except sqlite3.Error:
+        return {n: get_llc_info_remote(n) for n in owner_names}
+
+    found, misses = {}, {}
+    for name, norm in names.items():
+        if norm in found:
+            continue
+        seen = db.execute("SELECT fetched_at FROM entity_lookups WHERE query_norm = ?", (norm,)).fetchone()
+        searched = seen is not None and time.time() - seen[0] < ENTITY_TTL_SEC
+        row, score = _entity_best_match(db, norm)
+        if row is not None and score >= ENTITY_MATCH_MIN and (
+                searched or _entity_numbers(norm) == _entity_numbers(row['name_norm'])):
+            found[norm] = _llc_record(row, score)
+        elif searched:
+            found[norm] = {}  # cached miss
+        else:
+            misses.setdefault(norm, name)
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=min(4, len(misses))) as ex:
+            fetched = dict(zip(misses, ex.map(_in_context(_fetch_companies), misses.values())))
+        for norm, companies in fetched.items():
+            if companies is None:
+                found[norm] = {}  # upstream error: don't cache, retry next time
+                continue
+            _index_companies(db, norm, companies)
+            row, score = _entity_best_match(db, norm)
+            found[norm] = _llc_record(row, score) if row is not None and score >= ENTITY_MATCH_MIN else {}
+
+    return {n: found.get(names.get(n, ''), {}) for n in owner_names}
+
+
+def get_llc_info_remote(owner_name):
+    """Uncached OpenCorporates lookup (fallback when the index is unavailable)."""
+    companies = _fetch_companies(owner_name) or []
+    norm = _norm_entity(owner_name)
+    best = max(companies, key=lambda c: _name_similarity(norm, _norm_entity(c.get('name'))), default=None)
+    if not best:
         return {}
+    score = _name_similarity(norm, _norm_entity(best.get('name')))
+    return _llc_record(best, score) if score >= ENTITY_MATCH_MIN else {}
+
+
+def get_llc_info(owner_name):
+    if not owner_name:
+        return {}
+    return get_llc_info_batch([owner_name])[owner_name]
 
 def get_owner_profile(llc_name):
     return {
@@ -136,28 +1033,90 @@ def get_owner_profile(llc_name):
         'other_businesses': []
     }
 
+# Owner web presence: pages are fetched concurrently as raw bytes with a size
+# and wall-clock cap; title/description come from the <head> only and the
+# contact regexes run on bytes. Results are cached per URL.
+OWNER_PAGE_MAX_BYTES = int(os.getenv("OWNER_PAGE_MAX_BYTES", "400000"))
+OWNER_PAGE_TIMEOUT = 5
+# Bounded repeats: an unbounded local part goes quadratic on long base64/data-URI runs.
+EMAIL_RE = re.compile(rb'[A-Za-z0-9.+_-]{1,64}@[A-Za-z0-9._-]{1,253}\.[A-Za-z]{2,24}')
+PHONE_RE = re.compile(rb'\(?\d{3}\)?\s*\d{3}\s*\d{4}')
+HEAD_END_RE = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+META_DESC_RE = re.compile(rb'<meta\s[^>]*name\s*=\s*["\']description["\'][^>]*>', re.IGNORECASE)
+META_CONTENT_RE = re.compile(rb'content\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+
+
+def _fetch_bytes(url, timeout=OWNER_PAGE_TIMEOUT, max_bytes=OWNER_PAGE_MAX_BYTES):
+    """Raw response body, truncated at max_bytes or when `timeout` seconds elapse. b'' on failure."""
+    try:
+        timeout = _budget(timeout)
+        deadline = time.time() + timeout
+        headers = {"User-Agent": "Mozilla/5.0"}
+        with _get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as r:
+            buf = bytearray()
+            for chunk in r.iter_content(chunk_size=16384):
+                buf += chunk
+                _count_bytes(len(chunk))
+                if len(buf) >= max_bytes or time.time() > deadline:
+                    break
+            return bytes(buf[:max_bytes])
+    except RequestException:
+        _deadline_check()
+        return b""
+
+
+def _decode(b):
+    return html.unescape(b.decode('utf-8', 'replace')).strip()
+
+
+@_timed_parse
+def _extract_page_contacts(url, body):
+    """Title, meta description, emails and phones from a raw page body."""
+    m = HEAD_END_RE.search(body)
+    head = body[:m.start()] if m else body[:65536]
+    t = TITLE_RE.search(head)
+    title = _decode(t.group(1)) if t else ''
+    description = ''
+    d = META_DESC_RE.search(head)
+    if d:
+        c = META_CONTENT_RE.search(d.group(0))
+        if c:
+            description = _decode(c.group(1) or c.group(2) or b'')
+    return {
+        'url': url,
+        'title': title or url,
+        'description': description,
+        'emails': list(dict.fromkeys(e.decode('ascii', 'ignore') for e in EMAIL_RE.findall(body))),
+        'phones': list(dict.fromkeys(p.decode('ascii', 'ignore') for p in PHONE_RE.findall(body)))
+    }
+
+
+def _owner_page(url):
+    ck = f"contact:{url}"
+    cached = _cache_get(ck)
+    if cached is not None:
+        return cached
+    body = _fetch_bytes(url)
+    if not body:
+        return None
+    page = _offload_parse(_extract_page_contacts, url, body)
+    _cache_set(ck, page)
+    return page
+
+
 def search_owner_online(owner_name, address):
     query = owner_name or address
-    results = []
-    try:
-        for url in search(query, num_results=3):
-            html = requests.get(url, timeout=5).text
-            soup = BeautifulSoup(html, 'html.parser')
-            title = soup.title.string if soup.title else url
-            desc_tag = soup.find('meta', attrs={'name': 'description'})
-            description = desc_tag['content'] if desc_tag and desc_tag.get('content') else ''
-            emails = list(set(re.findall(r'[A-Za-z0-9.+_-]+@[A-Za-z0-9._-]+\.[A-Za-z]+', html)))
-            phones = list(set(re.findall(r'\(?\d{3}\)?\s*\d{3}\s*\d{4}', html)))
-            results.append({
-                'url': url,
-                'title': title,
-                'description': description,
-                'emails': emails,
-                'phones': phones
-            })
-    except:
-        pass
-    return results
+    try:
+        urls = _web_search(query, num_results=3)
+    except Exception:
+        _deadline_check()
+        return []
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=len(urls)) as ex:
+        pages = list(ex.map(_in_context(_owner_page), urls))
+    return [p for p in pages if p]
 
 
 # =====================================
@@ -173,10 +1132,11 @@ def nearby_storage(lat, lng, radius_m):
     }
     all_fac = []
     while True:
-        res = requests.get(url, params=params).json()
+        res = _get(url, params=params).json()
         all_fac.extend(res.get('results', []))
         token = res.get('next_page_token')
-        if not token:
+        left = _time_left()
+        if not token or (left is not None and left < 6):
             break
         time.sleep(2)
         params = {'pagetoken': token, 'key': GOOGLE_API_KEY}
@@ -216,20 +1176,34 @@ def get_market_comps(lat, lng):
 # =====================================
 # 5) Nearby Listings on CREXI/LoopNet
 # =====================================
-def scrape_crexi(lat, lng, radius_m=1):
+def _card_coords(card):
+    """{'lat', 'lng'} from data attributes on a listing card or its wrapper, if present."""
+    el = card
+    for _ in range(3):  # the card, its wrapper and the wrapper's parent
+        if el is None:
+            break
+        attrs, el = getattr(el, 'attrs', None) or {}, el.parent
+        lat = attrs.get('data-lat') or attrs.get('data-latitude')
+        lng = attrs.get('data-lng') or attrs.get('data-lon') or attrs.get('data-longitude')
+        if lat and lng:
+            try:
+                return {'lat': float(lat), 'lng': float(lng)}
+            except ValueError:
+                break
+    return {'lat': None, 'lng': None}
+
+
+@_timed_parse
+def _parse_crexi_cards(html):
     listings = []
     try:
-        url = (
-            f"https://www.crexi.com/search/properties"
-            f"?property_type=Self+Storage&lat={lat}&lng={lng}&radius={radius_m}"
-        )
-        html = requests.get(url, timeout=5).text
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = _soup(html)
         for card in soup.select(".propertycard"):
             name = card.select_one(".card-title")
             price = card.select_one(".card-price")
             size  = card.select_one(".card-size")
             link  = card.find("a", href=True)
+            addr  = card.select_one(".card-address, .property-address")
             if name and price and size:
                 p = re.sub(r'[^\d.]', '', price.get_text())
                 s = re.sub(r'[^\d.]', '', size.get_text())
@@ -240,23 +1214,37 @@ def scrape_crexi(lat, lng, radius_m=1):
                     'nrsf':   float(s),
                     'price':  float(p),
                     'ppsf':   ppsf,
-                    'link':   "https://www.crexi.com" + link['href'] if link else ''
+                    'link':   "https://www.crexi.com" + link['href'] if link else '',
+                    'address': addr.get_text(" ", strip=True) if addr else '',
+                    **_card_coords(card)
                 })
-    except (ReadTimeout, Exception):
+    except Exception:
         pass
     return listings
 
-def scrape_loopnet(lat, lng, radius_m=1):
+def scrape_crexi(lat, lng, radius_m=1):
+    try:
+        url = (
+            f"https://www.crexi.com/search/properties"
+            f"?property_type=Self+Storage&lat={lat}&lng={lng}&radius={radius_m}"
+        )
+        html = _get(url, timeout=5).text
+    except (ReadTimeout, Exception):
+        _deadline_check()
+        return []
+    return _offload_parse(_parse_crexi_cards, html)
+
+@_timed_parse
+def _parse_loopnet_cards(html):
     listings = []
     try:
-        url = f"https://www.loopnet.com/for-sale/self-storage/{lat},{lng}/radius-{radius_m}"
-        html = requests.get(url, timeout=5).text
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = _soup(html)
         for card in soup.select(".placardDetails"):
             name = card.select_one(".placardTitle a")
             price = card.select_one(".price")
             size  = card.select_one(".propertySize")
             link  = name['href'] if name else ''
+            addr  = card.select_one(".placardLocation, .subtitle-beta")
             if name and price and size:
                 p = re.sub(r'[^\d.]', '', price.get_text())
                 s = re.sub(r'[^\d.]', '', size.get_text())
@@ -267,25 +1255,286 @@ def scrape_loopnet(lat, lng, radius_m=1):
                     'nrsf':   float(s),
                     'price':  float(p),
                     'ppsf':   ppsf,
-                    'link':   "https://www.loopnet.com" + link
+                    'link':   "https://www.loopnet.com" + link,
+                    'address': addr.get_text(" ", strip=True) if addr else '',
+                    **_card_coords(card)
                 })
-    except (ReadTimeout, Exception):
+    except Exception:
         pass
     return listings
 
-def get_surrounding_listings(lat, lng):
-    return scrape_crexi(lat, lng) + scrape_loopnet(lat, lng)
+def scrape_loopnet(lat, lng, radius_m=1):
+    try:
+        url = f"https://www.loopnet.com/for-sale/self-storage/{lat},{lng}/radius-{radius_m}"
+        html = _get(url, timeout=5).text
+    except (ReadTimeout, Exception):
+        _deadline_check()
+        return []
+    return _offload_parse(_parse_loopnet_cards, html)
+
+# Listings cache: results are stored per geohash tile with a per-tile expiry.
+# A radius query covers the circle's bounding box with tiles, re-scrapes only
+# the stale ones (both sources for all stale tiles concurrently) and answers
+# from SQLite, keeping only listings within the radius. Listings are placed
+# by the coordinates on their card, else by geocoding their address; ones
+# that cannot be placed are dropped. They are de-duplicated across sources by
+# normalized address (the link when a card has none).
+LISTINGS_DB_PATH = os.getenv("LISTINGS_DB_PATH", os.path.join(DATA_DIR, "listings.sqlite"))
+LISTINGS_TILE_PRECISION = int(os.getenv("LISTINGS_TILE_PRECISION", "4"))
+LISTINGS_RADIUS_MI = float(os.getenv("LISTINGS_RADIUS_MI", "5"))
+LISTINGS_TTL_SEC = int(os.getenv("LISTINGS_TTL_SEC", str(24 * 60 * 60)))
+LISTINGS_EMPTY_TTL_SEC = int(os.getenv("LISTINGS_EMPTY_TTL_SEC", str(60 * 60)))
+_GEOHASH32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH32_INDEX = {c: i for i, c in enumerate(_GEOHASH32)}
+
+_listings_local = threading.local()
+
+
+def _geohash(lat, lng, precision):
+    lat_rng, lng_rng = [-90.0, 90.0], [-180.0, 180.0]
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        rng, v = (lng_rng, lng) if even else (lat_rng, lat)
+        mid = (rng[0] + rng[1]) / 2
+        ch <<= 1
+        if v >= mid:
+            ch |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_GEOHASH32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def _geohash_cell(precision):
+    """(height_deg, width_deg) of a geohash cell."""
+    nbits = precision * 5
+    return 180.0 / 2 ** (nbits // 2), 360.0 / 2 ** ((nbits + 1) // 2)
+
+
+def _geohash_center(gh):
+    lat_rng, lng_rng = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for c in gh:
+        d = _GEOHASH32_INDEX[c]
+        for shift in range(4, -1, -1):
+            rng = lng_rng if even else lat_rng
+            mid = (rng[0] + rng[1]) / 2
+            if d >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_rng[0] + lat_rng[1]) / 2, (lng_rng[0] + lng_rng[1]) / 2
+
+
+def _covering_tiles(lat, lng, radius_mi, precision=LISTINGS_TILE_PRECISION):
+    dlat = radius_mi / 69.0
+    dlng = radius_mi / max(1e-6, 69.0 * math.cos(math.radians(lat)))
+    h, w = _geohash_cell(precision)
+    tiles = []
+    y = lat - dlat
+    while True:
+        x = lng - dlng
+        while True:
+            gh = _geohash(max(-90.0, min(90.0, y)), ((x + 180) % 360) - 180, precision)
+            if gh not in tiles:
+                tiles.append(gh)
+            if x >= lng + dlng:
+                break
+            x = min(x + w, lng + dlng)
+        if y >= lat + dlat:
+            break
+        y = min(y + h, lat + dlat)
+    return tiles
+
+
+def _listing_key(l):
+    addr = " ".join(_ADDR_ABBREV.get(t, t) for t in _ADDR_PUNCT.sub(' ', (l.get('address') or '').upper()).split())
+    return f"addr:{addr}" if addr else f"link:{l.get('link') or l.get('name') or ''}"
+
+
+def _listings_db():
+    conn = getattr(_listings_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(LISTINGS_DB_PATH) or '.', exist_ok=True)
+        conn = sqlite3.connect(LISTINGS_DB_PATH, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        cols = {r['name'] for r in conn.execute("PRAGMA table_info(listings)")}
+        if cols and 'lat' not in cols:  # pre-coordinate cache: rebuild
+            with conn:
+                conn.execute("DROP TABLE listings")
+                conn.execute("DELETE FROM listing_tiles")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS listing_tiles (tile TEXT PRIMARY KEY, fetched_at REAL, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS listings (
+                tile TEXT NOT NULL, key TEXT NOT NULL, source TEXT, name TEXT,
+                nrsf REAL, price REAL, ppsf REAL, link TEXT, address TEXT, lat REAL, lng REAL,
+                PRIMARY KEY (tile, key)
+            );
+        """)
+        _listings_local.conn = conn
+    return conn
+
+
+def _geocode_listing(address):
+    """(lat, lng) for a listing address via the Geocoding API, or None."""
+    ck = f"geocode:{address}"
+    c = _cache_get(ck)
+    if c is not None:
+        return tuple(c) or None
+    try:
+        res = _get("https://maps.googleapis.com/maps/api/geocode/json",
+                   params={'address': address, 'key': GOOGLE_API_KEY}, timeout=5).json()
+    except Exception:
+        _deadline_check()
+        return None
+    if res.get('status') not in ('OK', 'ZERO_RESULTS'):
+        return None
+    loc = res['results'][0]['geometry']['location'] if res.get('results') else None
+    _cache_set(ck, [loc['lat'], loc['lng']] if loc else [])
+    return (loc['lat'], loc['lng']) if loc else None
+
+
+def _refresh_listing_tiles(tiles):
+    """Re-scrape both sources for every tile concurrently, place the listings
+    and replace the tiles' rows. Tiles whose scrapes ran into the request
+    deadline are left as they were; returns the set of those tiles."""
+    h, w = _geohash_cell(LISTINGS_TILE_PRECISION)
+    jobs = []
+    for t in tiles:
+        clat, clng = _geohash_center(t)
+        # radius (miles) reaching the tile corners
+        r = max(1, math.ceil(math.hypot(h * 69.0, w * 69.0 * math.cos(math.radians(clat))) / 2))
+        jobs += [(t, scrape_crexi, clat, clng, r), (t, scrape_loopnet, clat, clng, r)]
+    found, late = defaultdict(list), set()
+    db = _listings_db()
+    with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as ex:
+        futures = {ex.submit(_in_context(fn), clat, clng, r): t for t, fn, clat, clng, r in jobs}
+        for f in as_completed(futures):
+            try:
+                found[futures[f]].extend(f.result())
+            except DeadlineExceeded:
+                late.add(futures[f])
+            except Exception:
+                pass
+
+        # place listings without card coordinates: earlier rows first, then the geocoder
+        unplaced = {_listing_key(l): l for ls in found.values() for l in ls if l.get('lat') is None}
+        if unplaced:
+            q = ",".join("?" * len(unplaced))
+            known = {r['key']: (r['lat'], r['lng']) for r in db.execute(
+                f"SELECT key, lat, lng FROM listings WHERE key IN ({q}) AND lat IS NOT NULL", list(unplaced))}
+            todo = {l['address'] for k, l in unplaced.items() if k not in known and l.get('address')}
+            geo, late_addrs = {}, set()
+            for a, f in [(a, ex.submit(_in_context(_geocode_listing), a)) for a in todo]:
+                try:
+                    geo[a] = f.result()
+                except DeadlineExceeded:
+                    late_addrs.add(a)
+            for t, ls in found.items():
+                for l in ls:
+                    if l.get('lat') is None:
+                        if l.get('address') in late_addrs:
+                            late.add(t)
+                        l['lat'], l['lng'] = known.get(_listing_key(l)) or geo.get(l.get('address')) or (None, None)
+
+    now = time.time()
+    with db:
+        for t in tiles:
+            if t in late:
+                continue
+            rows = {}
+            for l in found.get(t, []):
+                rows.setdefault(_listing_key(l), l)
+            db.execute("DELETE FROM listings WHERE tile = ?", (t,))
+            db.executemany("INSERT INTO listings VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                           [(t, k, l['source'], l['name'], l['nrsf'], l['price'], l['ppsf'], l['link'],
+                             l.get('address') or '', l['lat'], l['lng'])
+                            for k, l in rows.items() if l['lat'] is not None])
+            ttl = LISTINGS_TTL_SEC if rows else LISTINGS_EMPTY_TTL_SEC
+            db.execute("INSERT OR REPLACE INTO listing_tiles VALUES (?,?,?)", (t, now, now + ttl))
+    return late
+
+
+def get_surrounding_listings(lat, lng, radius_mi=LISTINGS_RADIUS_MI):
+    """Cached for-sale listings within radius_mi of (lat, lng)."""
+    return _listings_within(lat, lng, radius_mi)[0]
+
+
+def _listings_within(lat, lng, radius_mi):
+    """(listings, coverage) for the circle. Tiles not refreshed before the
+    request deadline serve their previous rows, if any, and are counted in
+    coverage['pending']."""
+    tiles = _covering_tiles(lat, lng, radius_mi)
+    late = set()
+    dlat = radius_mi / 69.0
+    dlng = radius_mi / max(1e-6, 69.0 * math.cos(math.radians(lat)))
+    try:
+        db = _listings_db()
+        q = ",".join("?" * len(tiles))
+        fresh = {r['tile'] for r in db.execute(
+            f"SELECT tile FROM listing_tiles WHERE tile IN ({q}) AND expires_at > ?", (*tiles, time.time()))}
+        stale = [t for t in tiles if t not in fresh]
+        if stale:
+            late = _refresh_listing_tiles(stale)
+        # age of the oldest tile served (re-scraped tiles are live, late ones keep their old rows)
+        oldest = db.execute(f"SELECT MIN(fetched_at) FROM listing_tiles WHERE tile IN ({q})", tiles).fetchone()[0]
+        _count_cache("listings:", not stale, time.time() - oldest if oldest else None)
+        rows = db.execute(
+            f"SELECT * FROM listings WHERE tile IN ({q}) AND lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?",
+            (*tiles, lat - dlat, lat + dlat, lng - dlng, lng + dlng)).fetchall()
+    except sqlite3.Error:
+        # no cache: one live search around the point itself
+        r = max(1, math.ceil(radius_mi))
+        rows = scrape_crexi(lat, lng, r) + scrape_loopnet(lat, lng, r)
+        for l in rows:
+            if l.get('lat') is None and l.get('address'):
+                l['lat'], l['lng'] = _geocode_listing(l['address']) or (None, None)
+    out = {}
+    for r in rows:
+        # unplaced cards only occur in the live fallback, whose search radius already bounds them
+        if r['lat'] is not None and _haversine_mi(lat, lng, r['lat'], r['lng']) > radius_mi:
+            continue
+        out.setdefault(r['key'] if 'key' in r.keys() else _listing_key(r),
+                       {'source': r['source'], 'name': r['name'], 'nrsf': r['nrsf'], 'price': r['price'],
+                        'ppsf': r['ppsf'], 'link': r['link'], 'address': r['address'],
+                        'lat': r['lat'], 'lng': r['lng']})
+    return list(out.values()), {'tiles': len(tiles), 'pending': len(late)}
+
+
+def summarize_listings(listings, nrsf):
+    """(avg $/SF, recommended value for nrsf) from a set of listings."""
+    avg_ppsf  = round(sum(l['ppsf'] for l in listings) / len(listings), 2) if listings else 0
+    rec_value = round(avg_ppsf * nrsf, 2) if listings else 0
+    return avg_ppsf, rec_value
 
 
 # =====================================
 # 6) Tax history stub
 # =====================================
-def get_tax_history(address):
-    return [
-        {'year': 2023, 'tax': 3200},
-        {'year': 2022, 'tax': 3000},
-        {'year': 2021, 'tax': 2800}
-    ]
+def get_tax_history(address, county=None):
+    """Per-year tax levy for the parcel from the local roll store (newest first).
+
+    Empty when the county's roll layout has no tax column (see CAD_ROLL_LAYOUTS).
+    """
+    row = _cad_roll_match(county, address) if county else None
+    if row is None:
+        return []
+    try:
+        hist = _cad_db().execute(
+            "SELECT tax_year, tax, market_value FROM roll WHERE county = ? AND account = ? "
+            "ORDER BY tax_year DESC", (row['county'], row['account'])
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    return [{'year': h['tax_year'], 'tax': h['tax'], 'market_value': h['market_value']}
+            for h in hist if h['tax'] is not None]
 
 
 # =======================================================
@@ -303,6 +1552,24 @@ DISCOUNT_HINTS = re.compile(r'(now|online|special|promo|discount|sale|deal|today
 
 HEADLESS_RATES = os.getenv("HEADLESS_RATES", "1").strip() != "0"
 
+# Render profile: "fast" blocks images/media/fonts/analytics, uses the eager
+# page-load strategy and waits until a whitelisted size with a $ price shows up
+# in the DOM, or the page goes idle (document complete and body text unchanged
+# for HEADLESS_IDLE_POLLS polls), capped at HEADLESS_READY_TIMEOUT. "full"
+# loads everything.
+HEADLESS_PROFILE = os.getenv("HEADLESS_PROFILE", "fast").strip().lower()
+HEADLESS_READY_TIMEOUT = float(os.getenv("HEADLESS_READY_TIMEOUT", "6"))
+HEADLESS_IDLE_POLLS = int(os.getenv("HEADLESS_IDLE_POLLS", "2"))
+HEADLESS_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.mp3", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*hotjar.com*", "*clarity.ms*",
+    "*bat.bing.com*", "*segment.io*", "*segment.com*", "*hubspot.com*", "*newrelic.com*",
+    "*nr-data.net*", "*fullstory.com*", "*tiktok.com*", "*snapchat.com*", "*pinterest.com*",
+]
+DOLLAR_RE = re.compile(r'\$\s?\d{2,4}')
+
 # Selenium setup (lazy)
 _SELENIUM_OK = None
 _driver_path_hint = os.getenv("CHROMEDRIVER_PATH")  # optional
@@ -321,48 +1588,161 @@ def _have_selenium():
     return _SELENIUM_OK
 
 
-def _headless_html(url, timeout=12):
-    """Fetch fully rendered HTML via Selenium headless. Returns '' on failure."""
+# Raw page archive: every rendered/fetched page is stored once as a gzip blob
+# named by its SHA-256, indexed by URL, site, fetch time and mode, so parser
+# changes can be replayed offline (`flask reparse-snapshots`).
+SNAPSHOTS = os.getenv("SNAPSHOTS", "1").strip() != "0"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshots"))
+
+_snapshot_local = threading.local()
+
+
+def _snapshot_db():
+    conn = getattr(_snapshot_local, 'conn', None)
+    if conn is None:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(SNAPSHOT_DIR, "index.sqlite"), timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY, url TEXT NOT NULL, site TEXT, sha256 TEXT NOT NULL,
+                fetched_at REAL NOT NULL, mode TEXT, bytes INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_site ON snapshots (site, url, fetched_at);
+        """)
+        _snapshot_local.conn = conn
+    return conn
+
+
+def _snapshot_path(sha):
+    return os.path.join(SNAPSHOT_DIR, sha[:2], f"{sha}.html.gz")
+
+
+def _archive_page(url, html, mode, site=None):
+    if not SNAPSHOTS or not html:
+        return
+    try:
+        raw = html.encode('utf-8', 'replace')
+        sha = hashlib.sha256(raw).hexdigest()
+        path = _snapshot_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(gzip.compress(raw, compresslevel=6))
+            os.replace(tmp, path)
+        db = _snapshot_db()
+        with db:
+            db.execute("INSERT INTO snapshots (url, site, sha256, fetched_at, mode, bytes) VALUES (?,?,?,?,?,?)",
+                       (url, site or url, sha, time.time(), mode, len(raw)))
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def _load_snapshot(sha):
+    with gzip.open(_snapshot_path(sha), 'rb') as f:
+        return f.read().decode('utf-8', 'replace')
+
+
+def _rates_rendered(text):
+    """True once page text shows a whitelisted unit size and a dollar price."""
+    if not text or not DOLLAR_RE.search(text):
+        return False
+    return any(_normalize_size(m.group(1), m.group(2)) for m in UNIT_RE.finditer(text))
+
+
+class _RenderReady:
+    """WebDriverWait condition: rates visible, or the page has gone idle."""
+
+    def __init__(self, idle_polls=HEADLESS_IDLE_POLLS):
+        self.idle_polls = idle_polls
+        self.last_len = None
+        self.same = 0
+
+    def __call__(self, driver):
+        state, text = driver.execute_script(
+            "return [document.readyState, document.body ? document.body.innerText : ''];")
+        if _rates_rendered(text):
+            return True
+        if state != 'complete' or len(text) != self.last_len:
+            self.last_len, self.same = len(text), 0
+            return False
+        self.same += 1
+        return self.same >= self.idle_polls
+
+
+def _headless_html(url, timeout=12, site=None):
+    """Fetch rendered HTML via Selenium headless. Returns '' on failure; raises
+    DeadlineExceeded if the request deadline leaves no time to render."""
     if not HEADLESS_RATES or not _have_selenium():
         return ""
+    left = _time_left()
+    if left is not None and left < 3:
+        # too little budget to launch Chrome; an HTTP-only page would be cached as if complete
+        raise DeadlineExceeded("not enough time left to render")
     try:
+        timeout = _budget(timeout)
         from selenium import webdriver
         from selenium.webdriver.chrome.options import Options
         from selenium.webdriver.common.by import By
         from selenium.webdriver.support.ui import WebDriverWait
         from selenium.webdriver.support import expected_conditions as EC
 
+        fast = HEADLESS_PROFILE == "fast"
         options = Options()
         options.add_argument("--headless=new")
         options.add_argument("--disable-gpu")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--window-size=1200,2000")
+        if fast:
+            options.page_load_strategy = "eager"
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.media_stream": 2,
+            })
         # Try selenium-manager (Selenium 4.6+) to auto-manage driver:
+        t0 = time.perf_counter()
         driver = webdriver.Chrome(options=options)
+        _count_call(url)
         try:
+            if fast:
+                try:
+                    driver.execute_cdp_cmd("Network.enable", {})
+                    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": HEADLESS_BLOCKED_URLS})
+                except Exception:
+                    pass
             driver.set_page_load_timeout(timeout)
             driver.get(url)
             # wait for something meaningful to render
             try:
-                WebDriverWait(driver, 6).until(
-                    EC.presence_of_all_elements_located((By.TAG_NAME, "body"))
-                )
+                if fast:
+                    WebDriverWait(driver, _budget(HEADLESS_READY_TIMEOUT), poll_frequency=0.25).until(
+                        _RenderReady())
+                else:
+                    WebDriverWait(driver, _budget(6)).until(
+                        EC.presence_of_all_elements_located((By.TAG_NAME, "body"))
+                    )
             except Exception:
-                pass
+                _deadline_check()  # a render cut short is not a page
             html = driver.page_source or ""
+            _count_bytes(len(html))
+            _archive_page(url, html, 'headless', site)
             return html
         finally:
             driver.quit()
+            _count_render(time.perf_counter() - t0)
     except Exception:
+        _deadline_check()
         return ""
 
 
-def _http_html(url, timeout=10, max_bytes=900_000):
+def _http_html(url, timeout=10, max_bytes=900_000, site=None):
     """Fast HTTP fetch (no JS)."""
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
-        with requests.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as r:
+        with _get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as r:
             ct = (r.headers.get("Content-Type") or "").lower()
             if "html" not in ct:
                 return ""
@@ -373,10 +1753,14 @@ def _http_html(url, timeout=10, max_bytes=900_000):
                     break
                 content.append(chunk)
                 total += len(chunk)
+                _count_bytes(len(chunk))
                 if total >= max_bytes:
                     break
-            return "".join(content)
+            html = "".join(content)
+            _archive_page(url, html, 'http', site)
+            return html
     except Exception:
+        _deadline_check()
         return ""
 
 
@@ -423,13 +1807,14 @@ def _extract_standard_price_from_window(txt):
     return max(prices), cc
 
 
+@_timed_parse
 def _parse_rates_from_html(html):
     """Return dict: {size: {'climate': price_or_None, 'non_climate': price_or_None}} – only standard rates."""
     out = {}
     if not html:
         return out
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = _soup(html)
         raw_text = soup.get_text(separator=" ", strip=True)
     except Exception:
         raw_text = re.sub(r'<[^>]+>', ' ', html)
@@ -464,22 +1849,8 @@ def _parse_rates_from_html(html):
     return out
 
 
-def scrape_rates_from_website(url):
-    """Fetch a site's page(s) and extract standard (non-discount) rates."""
-    if not url:
-        return {}
-
-    ck = f"rates:{url}"
-    cached = _cache_get(ck)
-    if cached is not None:
-        return cached
-
-    # Try headless first, then HTTP
-    html = _headless_html(url)
-    if not html:
-        html = _http_html(url)
-
-    # Try common pricing paths if base page fails to produce rates
+def _rate_candidates(url):
+    """Base URL plus the common pricing paths tried when it has no rates."""
     candidates = [url]
     for path in ("/units", "/rent", "/storage-units", "/self-storage", "/pricing", "/rates", "/rent-online"):
         try:
@@ -487,15 +1858,14 @@ def scrape_rates_from_website(url):
             candidates.append(base + path)
         except Exception:
             pass
+    # short budget for secondary pages
+    return candidates[:4]
+
 
+def _merge_rates(pages):
+    """Merge per-page rate dicts, keeping the min price for each bucket (more conservative)."""
     merged = {}
-    # short budget for secondary pages
-    for i, u in enumerate(candidates[:4]):
-        h = html if i == 0 else (_headless_html(u) or _http_html(u))
-        if not h:
-            continue
-        rates = _parse_rates_from_html(h)
-        # merge, keep min price for each bucket (more conservative)
+    for rates in pages:
         for size, buckets in rates.items():
             if size not in SIZE_WHITELIST:
                 continue
@@ -506,11 +1876,83 @@ def scrape_rates_from_website(url):
                     continue
                 if merged[size][b] is None or val < merged[size][b]:
                     merged[size][b] = val
+    return merged
+
+
+def scrape_rates_from_website(url):
+    """Fetch a site's page(s) and extract standard (non-discount) rates."""
+    if not url:
+        return {}
+
+    cached = _cache_get(f"rates:{url}", refresh=lambda: _scrape_rates_live(url))
+    if cached is not None:
+        return cached
+    return _scrape_rates_live(url)
+
 
-    _cache_set(ck, merged)
+def _scrape_rates_live(url):
+    # Try headless first, then HTTP
+    html = _headless_html(url, site=url)
+    if not html:
+        html = _http_html(url, site=url)
+
+    # Try common pricing paths if base page fails to produce rates
+    pages = []
+    for i, u in enumerate(_rate_candidates(url)):
+        h = html if i == 0 else (_headless_html(u, site=url) or _http_html(u, site=url))
+        if not h:
+            continue
+        pages.append(_offload_parse(_parse_rates_from_html, h))
+    merged = _merge_rates(pages)
+
+    _cache_set(f"rates:{url}", merged)
     return merged
 
 
+def _reparse_snapshot(sha):
+    """Parse one archived page (runs in a worker process)."""
+    try:
+        return _parse_rates_from_html(_load_snapshot(sha))
+    except OSError:
+        return {}
+
+
+def reparse_snapshots(workers=None, since=None):
+    """Re-run the current rate parser over the latest archived pages of every site
+    and rewrite the `rates:` cache entries. Returns (sites, pages) processed.
+
+    Entries keep the age of the pages they were parsed from; pages older than
+    CACHE_HARD_TTL_SEC are skipped, as the cache would not serve them anyway.
+    """
+    db = _snapshot_db()
+    rows = db.execute(
+        "SELECT site, url, sha256, fetched_at FROM snapshots s WHERE fetched_at = "
+        "(SELECT MAX(fetched_at) FROM snapshots t WHERE t.site = s.site AND t.url = s.url) "
+        "AND fetched_at >= ?", (max(since or 0, time.time() - CACHE_HARD_TTL_SEC),)
+    ).fetchall()
+    by_site = defaultdict(dict)
+    for site, url, sha, fetched_at in rows:
+        by_site[site][url] = (sha, fetched_at)
+    jobs, fetched = [], {}
+    for site, pages in by_site.items():
+        for u in _rate_candidates(site):
+            if u in pages:
+                jobs.append((site, pages[u][0]))
+                fetched[site] = min(fetched.get(site, pages[u][1]), pages[u][1])
+    if not jobs:
+        return 0, 0
+
+    ctx = multiprocessing.get_context("forkserver" if sys.platform.startswith("linux") else "spawn")
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx) as ex:
+        parsed = ex.map(_reparse_snapshot, [sha for _, sha in jobs], chunksize=16)
+        per_site = defaultdict(list)
+        for (site, _), rates in zip(jobs, parsed):
+            per_site[site].append(rates)
+    for site, pages in per_site.items():
+        _cache_set(f"rates:{site}", _merge_rates(pages), ts=fetched[site])
+    return len(per_site), len(jobs)
+
+
 def _domain(url):
     try:
         return urlparse(url).netloc.lower()
@@ -519,12 +1961,16 @@ def _domain(url):
 
 
 def get_place_website(place_id):
-    ck = f"place_site:{place_id}"
-    c = _cache_get(ck)
+    c = _cache_get(f"place_site:{place_id}", refresh=lambda: _place_website_live(place_id))
     if c is not None:
         return c
+    return _place_website_live(place_id)
+
+
+def _place_website_live(place_id):
+    ck = f"place_site:{place_id}"
     try:
-        res = requests.get(
+        res = _get(
             "https://maps.googleapis.com/maps/api/place/details/json",
             params={'place_id': place_id, 'fields': 'website,url', 'key': GOOGLE_API_KEY},
             timeout=6
@@ -533,6 +1979,7 @@ def get_place_website(place_id):
         _cache_set(ck, site)
         return site
     except Exception:
+        _deadline_check()
         _cache_set(ck, None)
         return None
 
@@ -540,64 +1987,78 @@ def get_place_website(place_id):
 def discover_website_for(name, vicinity):
     """Fallback website discovery via web search (skip aggregators)."""
     query = f"{name} {vicinity} storage website"
-    ck = f"discover:{query}"
-    c = _cache_get(ck)
+    c = _cache_get(f"discover:{query}", refresh=lambda: _discover_website_live(query))
     if c is not None:
         return c
+    return _discover_website_live(query)
+
+
+def _discover_website_live(query):
+    ck = f"discover:{query}"
     try:
-        for url in search(query, num_results=3):
+        for url in _web_search(query, num_results=3):
             u = url.lower()
             if any(b in u for b in ["facebook.com", "yelp.com", "google.com/maps", "bing.com", "yellowpages", "sparefoot", "selfstorage.com", "storage.com"]):
                 continue
             _cache_set(ck, url)
             return url
     except Exception:
-        pass
+        _deadline_check()
     _cache_set(ck, None)
     return None
 
 
-def build_rate_analysis(subject_place, market):
-    """Return (subject_rates, competitor_rates_list, summary_by_size)."""
-    # Subject
-    subject_site = subject_place.get('website') if subject_place else None
-    if not subject_site and subject_place:
-        subject_site = discover_website_for(subject_place.get('name', ''), subject_place.get('formatted_address', ''))
-
-    subject_rates = scrape_rates_from_website(subject_site) if subject_site else {}
-
-    # Competitors (all within 5 miles); include even if no website
-    competitors_raw = market.get('competitors_5', [])
-    MAX_COMP = 12  # cover all typical sites in dense markets without timeouts
-    competitors = competitors_raw[:MAX_COMP]
-
-    def scrape_comp(c):
-        name = c.get('name', '')
-        vicinity = c.get('vicinity', '')
-        website = get_place_website(c.get('place_id')) or discover_website_for(name, vicinity)
-        if website:
-            rates = scrape_rates_from_website(website)
-        else:
-            rates = {}
-        # Only self-storage: light filter by name keywords (optional; Places type is already 'storage')
-        return {
-            'name': name,
-            'vicinity': vicinity,
-            'website': website or '',
-            'rates': {k: v for k, v in rates.items() if k in SIZE_WHITELIST}
-        }
+# Competitor rates are gathered progressively: the RATE_FOREGROUND_COMPS
+# nearest uncached competitors are scraped on the request path, the rest of
+# the 5- and 10-mile sets are queued on the background refresh pool. Only the
+# resolved website is cached per place (comp_site:, '' for none); rates are
+# always read from the site's rates: entry, so later views, `flask prewarm`
+# and `flask reparse-snapshots` all feed the market summary directly.
+RATE_FOREGROUND_COMPS = int(os.getenv("RATE_FOREGROUND_COMPS", "12"))
+RATE_FOREGROUND_TIMEOUT = 20
 
-    comp_data = []
-    if competitors:
-        with ThreadPoolExecutor(max_workers=min(6, len(competitors))) as ex:
-            futures = [ex.submit(scrape_comp, c) for c in competitors]
-            for f in as_completed(futures, timeout=20):
-                try:
-                    comp_data.append(f.result())
-                except Exception:
-                    pass
 
-    # Summary (subject vs comp averages & max)
+def _competitor_key(c):
+    return f"comp_site:{c.get('place_id') or (c.get('name', '') + '|' + c.get('vicinity', ''))}"
+
+
+def _competitor_entry(c, website, rates):
+    return {
+        'place_id': c.get('place_id'),
+        'name': c.get('name', ''),
+        'vicinity': c.get('vicinity', ''),
+        'lat': c.get('lat'),
+        'lng': c.get('lng'),
+        'website': website or '',
+        'rates': {k: v for k, v in (rates or {}).items() if k in SIZE_WHITELIST}
+    }
+
+
+def _competitor_site_live(c):
+    site = get_place_website(c.get('place_id')) or discover_website_for(c.get('name', ''), c.get('vicinity', ''))
+    _cache_set(_competitor_key(c), site or '')
+    return site or ''
+
+
+def _scrape_competitor_live(c):
+    website = _competitor_site_live(c)
+    # Only self-storage: light filter by name keywords (optional; Places type is already 'storage')
+    return _competitor_entry(c, website, scrape_rates_from_website(website) if website else {})
+
+
+def _cached_competitor(c):
+    """Competitor entry from the cached website and rates, or None if either is missing."""
+    website = _cache_get(_competitor_key(c), refresh=lambda: _competitor_site_live(c))
+    if website is None:
+        return None
+    if not website:
+        return _competitor_entry(c, '', {})
+    rates = _cache_get(f"rates:{website}", refresh=lambda: _scrape_rates_live(website))
+    return None if rates is None else _competitor_entry(c, website, rates)
+
+
+def _rate_summary(subject_rates, comp_data):
+    """Subject vs competitor averages & max per size."""
     def avg(xs): return round(sum(xs) / len(xs), 2) if xs else 0
     summary = {}
     for size in sorted(SIZE_WHITELIST):
@@ -626,14 +2087,600 @@ def build_rate_analysis(subject_place, market):
             'increase_pct_climate': inc_cc,
             'increase_pct_non_climate': inc_nc
         }
+    return summary
+
+
+def build_rate_analysis(subject_place, market, origin=None):
+    """Return (subject_rates, competitor_rates_list, summary_by_size, extras).
+
+    competitor_rates_list covers the 5-mile set; extras holds the 10-mile
+    ring ('competitor_rates_10'), the summary over both rings
+    ('rate_analysis_10'), how much of the market is done ('rate_coverage',
+    with 'subject_pending' when the subject ran out of time) and the subject's
+    resolved site ('subject_website', possibly found by search). Work that misses
+    the request deadline is finished in the background for the next view.
+    """
+    # Subject
+    subject_pending = False
+    subject_site = subject_place.get('website') if subject_place else None
+    try:
+        if not subject_site and subject_place:
+            subject_site = discover_website_for(subject_place.get('name', ''), subject_place.get('formatted_address', ''))
+        subject_rates = scrape_rates_from_website(subject_site) if subject_site else {}
+    except DeadlineExceeded:
+        subject_pending, subject_rates = True, {}
+        if subject_site:
+            _schedule_refresh(f"rates:{subject_site}", lambda: _scrape_rates_live(subject_site))
+
+    # Competitors (5- then 10-mile ring, nearest first); include even if no website
+    ring = {}
+    for r, key in ((5, 'competitors_5'), (10, 'competitors_10')):
+        for c in market.get(key, []):
+            ring.setdefault(_competitor_key(c), (r, c))
+    ordered = list(ring.items())
+    if origin:
+        ordered.sort(key=lambda kv: (kv[1][0], _haversine_mi(origin[0], origin[1],
+                                                             kv[1][1].get('lat') or origin[0],
+                                                             kv[1][1].get('lng') or origin[1])))
+
+    results, foreground, background = {}, [], []
+    for key, (r, c) in ordered:
+        cached = _cached_competitor(c)
+        if cached is not None:
+            results[key] = cached
+        elif len(foreground) < RATE_FOREGROUND_COMPS:
+            foreground.append((key, c))
+        else:
+            background.append((key, c))
+
+    left = _time_left()
+    wait = RATE_FOREGROUND_TIMEOUT if left is None else min(RATE_FOREGROUND_TIMEOUT, left)
+    if foreground and wait <= 0:
+        background, foreground = foreground + background, []
+    if foreground:
+        # Scrapes run without the request deadline: the request stops waiting
+        # after `wait`, stragglers keep running and cache their result.
+        ex = ThreadPoolExecutor(max_workers=min(6, len(foreground)))
+        futures = {ex.submit(_detached(_scrape_competitor_live), c): key for key, c in foreground}
+        try:
+            for f in as_completed(futures, timeout=wait):
+                try:
+                    results[futures[f]] = f.result()
+                except Exception:
+                    pass
+        except TimeoutError:
+            pass
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+            background += [(k, c) for f, (k, c) in zip(futures, foreground) if f.cancelled()]
+
+    for key, c in background:
+        _schedule_refresh(key, lambda c=c: _scrape_competitor_live(c))
+
+    comp_data = [dict(results[k], ring=r) for k, (r, c) in ordered if k in results]
+    comp_5 = [c for c in comp_data if c['ring'] == 5]
+    extras = {
+        'competitor_rates_10': [c for c in comp_data if c['ring'] == 10],
+        'rate_analysis_10': _rate_summary(subject_rates, comp_data),
+        'rate_coverage': {'total': len(ordered), 'done': len(comp_data), 'pending': len(ordered) - len(comp_data),
+                          'subject_pending': subject_pending},
+        'subject_website': subject_site or '',
+    }
+    summary = _rate_summary(subject_rates, comp_5)
 
     subject_rates = {k: v for k, v in subject_rates.items() if k in SIZE_WHITELIST}
-    return subject_rates, comp_data, summary
+    return subject_rates, comp_5, summary, extras
+
+
+# =====================================
+# 6b) Rate history (Parquet, partitioned)
+# =====================================
+# Every rate observation is appended to a hive-partitioned Parquet dataset
+# (state=/county=/date=) so trends and percentiles come from disk instead of a
+# re-scrape. Queries filter on partition keys and a lat/lng bounding box, so
+# only matching partitions and row groups are read. A scrape is recorded once,
+# stamped with when it was fetched (not when it was viewed), queries keep one
+# row per place/size/bucket/day, and `flask compact-rate-history` merges the
+# small per-request files of past days.
+RATE_HISTORY_DIR = os.getenv("RATE_HISTORY_DIR", os.path.join(DATA_DIR, "rate_history"))
+RATE_HISTORY = os.getenv("RATE_HISTORY", "1").strip() != "0"
+
+
+def _rate_history_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('observed_at', pa.timestamp('s', tz='UTC')),
+        ('role', pa.string()),
+        ('subject_place_id', pa.string()),
+        ('place_id', pa.string()),
+        ('name', pa.string()),
+        ('website', pa.string()),
+        ('lat', pa.float64()),
+        ('lng', pa.float64()),
+        ('size', pa.string()),
+        ('bucket', pa.string()),
+        ('rate', pa.float64()),
+        ('state', pa.string()),
+        ('county', pa.string()),
+        ('date', pa.string()),
+    ])
+
+
+def _rate_history_partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([('state', pa.string()), ('county', pa.string()), ('date', pa.string())]),
+                           flavor='hive')
+
+
+def _haversine_mi(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 3958.8 * 2 * math.asin(math.sqrt(a))
+
+
+def _rate_history_mark(role, pid, website):
+    return f"rate_hist:{role}|{pid or ''}|{website or ''}"
+
+
+def record_rate_history(subject_place, subject_rates, comp_data, lat, lng, county, state):
+    """Append the not yet recorded scrapes of one analysis (subject + competitors,
+    one row per size/bucket) to the dataset; returns the number of rows written."""
+    if not RATE_HISTORY:
+        return 0
+    base = {'subject_place_id': (subject_place or {}).get('place_id'),
+            'state': state or 'unknown', 'county': county or 'unknown'}
+    rows, marks = [], []
+
+    def add(role, pid, name, website, plat, plng, rates):
+        if not rates:
+            return
+        # the rates: entry's timestamp is when the site was last scraped
+        age = _cache_age(f"rates:{website}") if website else None
+        fetched = time.time() - (age or 0)
+        mark = _rate_history_mark(role, pid, website)
+        seen = _CACHE.get(mark) or _cache_disk_get(mark)
+        if seen and seen[0] >= int(fetched):
+            return
+        observed = datetime.fromtimestamp(int(fetched), timezone.utc)
+        for size, buckets in rates.items():
+            for bucket in ('climate', 'non_climate'):
+                if buckets.get(bucket) is not None:
+                    rows.append(dict(base, observed_at=observed, date=observed.date().isoformat(),
+                                     role=role, place_id=pid, name=name, website=website,
+                                     lat=plat, lng=plng, size=size, bucket=bucket, rate=float(buckets[bucket])))
+        marks.append((mark, int(fetched)))
+
+    add('subject', base['subject_place_id'], (subject_place or {}).get('name'),
+        (subject_place or {}).get('website'), lat, lng, subject_rates)
+    for c in comp_data:
+        add('competitor', c.get('place_id'), c.get('name'), c.get('website'), c.get('lat'), c.get('lng'), c.get('rates'))
+    if not rows:
+        return 0
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        ds.write_dataset(
+            pa.Table.from_pylist(rows, schema=_rate_history_schema()), RATE_HISTORY_DIR,
+            format='parquet', partitioning=_rate_history_partitioning(),
+            existing_data_behavior='overwrite_or_ignore',
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet"
+        )
+    except Exception:
+        return 0
+    for mark, fetched in marks:
+        _cache_set(mark, fetched)
+    return len(rows)
+
+
+def _rate_history_dedupe(rows):
+    """Latest row per role/place/size/bucket/day."""
+    latest = {}
+    for r in rows:
+        k = (r['role'], r['place_id'] or r['website'], r['size'], r['bucket'], r['date'])
+        if k not in latest or r['observed_at'] > latest[k]['observed_at']:
+            latest[k] = r
+    return list(latest.values())
+
+
+def compact_rate_history(min_files=2):
+    """Merge the files of each past date partition into one de-duplicated file.
+
+    Today's partitions are left alone since requests are still writing to them.
+    Returns (partitions, files) compacted.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    today = datetime.now(timezone.utc).date().isoformat()
+    parts = files_in = 0
+    for root, _, files in os.walk(RATE_HISTORY_DIR):
+        leaf = os.path.basename(root)
+        names = sorted(f for f in files if f.endswith('.parquet'))
+        if not leaf.startswith('date=') or leaf[5:] >= today or len(names) < min_files:
+            continue
+        paths = [os.path.join(root, f) for f in names]
+        table = pa.concat_tables([pq.read_table(p) for p in paths])
+        date = leaf[5:]
+        rows = [dict(r, date=date) for r in table.to_pylist()]
+        keep = [{k: v for k, v in r.items() if k in table.column_names} for r in _rate_history_dedupe(rows)]
+        out = os.path.join(root, f"part-compacted-{uuid.uuid4().hex}.parquet")
+        pq.write_table(pa.Table.from_pylist(keep, schema=table.schema), out + ".tmp")
+        os.replace(out + ".tmp", out)
+        for p in paths:
+            os.remove(p)
+        parts += 1
+        files_in += len(paths)
+    return parts, files_in
+
+
+def rate_history(lat, lng, radius_mi=5, start=None, end=None, state=None, county=None,
+                 sizes=None, role='competitor'):
+    """Rate percentiles and a daily median trend per size/bucket within radius_mi.
+
+    `start`/`end` are ISO dates (inclusive); pass `state`/`county` to prune
+    partitions. Returns {'size|bucket': {'n', 'p10'..'p90', 'avg', 'trend': [...]}}.
+    """
+    import pyarrow.dataset as ds
+    if not os.path.isdir(RATE_HISTORY_DIR):
+        return {}
+    dataset = ds.dataset(RATE_HISTORY_DIR, format='parquet', partitioning=_rate_history_partitioning())
+    dlat = radius_mi / 69.0
+    dlng = radius_mi / max(1e-6, 69.0 * math.cos(math.radians(lat)))
+    filt = ((ds.field('lat') >= lat - dlat) & (ds.field('lat') <= lat + dlat) &
+            (ds.field('lng') >= lng - dlng) & (ds.field('lng') <= lng + dlng))
+    if start:
+        filt &= ds.field('date') >= str(start)
+    if end:
+        filt &= ds.field('date') <= str(end)
+    if state:
+        filt &= ds.field('state') == state
+    if county:
+        filt &= ds.field('county') == county
+    if role:
+        filt &= ds.field('role') == role
+    if sizes:
+        filt &= ds.field('size').isin(list(sizes))
+    table = dataset.to_table(columns=['observed_at', 'role', 'place_id', 'website', 'date',
+                                      'lat', 'lng', 'size', 'bucket', 'rate'], filter=filt)
+
+    groups = defaultdict(list)
+    by_day = defaultdict(lambda: defaultdict(list))
+    for r in _rate_history_dedupe(table.to_pylist()):
+        if _haversine_mi(lat, lng, r['lat'], r['lng']) > radius_mi:
+            continue
+        key = f"{r['size']}|{r['bucket']}"
+        groups[key].append(r['rate'])
+        by_day[key][r['date']].append(r['rate'])
+
+    def pct(xs, q):
+        return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2)
+
+    out = {}
+    for key, xs in sorted(groups.items()):
+        xs.sort()
+        out[key] = {
+            'n': len(xs),
+            'avg': round(sum(xs) / len(xs), 2),
+            **{f"p{int(q * 100)}": pct(xs, q) for q in (0.1, 0.25, 0.5, 0.75, 0.9)},
+            'trend': [{'date': d, 'median': pct(sorted(v), 0.5), 'n': len(v)}
+                      for d, v in sorted(by_day[key].items())]
+        }
+    return out
+
+
+@app.route('/api/rate-history')
+def rate_history_api():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius_mi = float(request.args.get('radius_mi', 5))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng are required numbers'}), 400
+    sizes = [x for x in request.args.get('sizes', '').split(',') if x] or None
+    return jsonify(rate_history(
+        lat, lng, radius_mi,
+        start=request.args.get('start'), end=request.args.get('end'),
+        state=request.args.get('state'), county=request.args.get('county'),
+        sizes=sizes, role=request.args.get('role', 'competitor') or None
+    ))
 
 
 # =====================================
-# 7) Flask view (kept intact; only adds rate fields)
+# 6c) Cache pre-warmer (watched submarkets)
 # =====================================
+# Sweeps a watchlist of centers off-hours: Places nearby search, website
+# resolution and rate scraping for every facility, so the first daytime
+# evaluation in a watched metro hits a warm cache. Runs inside a
+# _RequestStats context so Google calls and Chrome renders can be budgeted.
+def load_watchlist(path):
+    """[{'name', 'lat', 'lng', 'radius_mi'}, ...] from a JSON file."""
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+    items = raw.get('centers', []) if isinstance(raw, dict) else raw
+    return [{'name': c.get('name') or f"{c['lat']},{c['lng']}", 'lat': float(c['lat']), 'lng': float(c['lng']),
+             'radius_mi': float(c.get('radius_mi', 5))} for c in items]
+
+
+def prewarm_watchlist(centers, concurrency=4, max_google_calls=None, max_renders=None,
+                      max_age_sec=CACHE_TTL_SEC // 2):
+    """Warm place_site:/discover:/comp_site:/rates: entries for all facilities around each center.
+
+    Entries younger than max_age_sec are left alone. Stops scheduling new work
+    once a budget is spent. Returns a summary dict.
+    """
+    st = _RequestStats()
+    token = _REQ_STATS.set(st)
+    summary = {'centers': 0, 'facilities': 0, 'warmed': 0, 'fresh': 0, 'no_site': 0, 'center_errors': 0,
+               'budget_exhausted': False}
+
+    def over_budget():
+        return ((max_google_calls is not None and sum(st.google_calls.values()) >= max_google_calls) or
+                (max_renders is not None and st.chrome_launches >= max_renders))
+
+    def fresh(key):
+        age = _cache_age(key)
+        return age is not None and age < max_age_sec
+
+    def warm(fac):
+        pid, name, vicinity = fac.get('place_id'), fac.get('name', ''), fac.get('vicinity', '')
+        if fresh(f"place_site:{pid}"):
+            site = get_place_website(pid)
+        else:
+            site = _place_website_live(pid)
+        if not site:
+            query = f"{name} {vicinity} storage website"
+            site = (discover_website_for(name, vicinity) if fresh(f"discover:{query}")
+                    else _discover_website_live(query))
+        _cache_set(_competitor_key(fac), site or '')
+        if not site:
+            return 'no_site'
+        if fresh(f"rates:{site}"):
+            return 'fresh'
+        _scrape_rates_live(site)
+        return 'warmed'
+
+    try:
+        seen = set()
+        for center in centers:
+            if over_budget():
+                summary['budget_exhausted'] = True
+                break
+            summary['centers'] += 1
+            try:
+                found = nearby_storage(center['lat'], center['lng'], center['radius_mi'] * 1609.34)
+            except Exception as e:
+                app.logger.warning("prewarm: nearby search failed for %s: %s", center.get('name') or center, e)
+                summary['center_errors'] += 1
+                continue
+            facs = [f for f in found if f.get('place_id') and f['place_id'] not in seen]
+            seen.update(f['place_id'] for f in facs)
+            summary['facilities'] += len(facs)
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+                futures = []
+                for f in facs:
+                    if over_budget():
+                        summary['budget_exhausted'] = True
+                        break
+                    futures.append(ex.submit(_in_context(lambda f=f: None if over_budget() else warm(f))))
+                for fut in as_completed(futures):
+                    try:
+                        outcome = fut.result()
+                    except Exception:
+                        continue
+                    if outcome:
+                        summary[outcome] += 1
+                    else:
+                        summary['budget_exhausted'] = True
+    finally:
+        _REQ_STATS.reset(token)
+    summary.update({'google_calls': sum(st.google_calls.values()), 'chrome_launches': st.chrome_launches,
+                    'seconds': round(time.perf_counter() - st.t0, 1)})
+    return summary
+
+
+# =====================================
+# 7) Evaluation stages + Flask views
+# =====================================
+# An evaluation is a set of lazily computed, memoized stages; asking for one
+# stage computes only it and what it depends on (e.g. 'llc' -> 'cad' ->
+# 'location'). The HTML view runs all of them; /api/evaluate runs a subset.
+EVAL_STAGES = ('location', 'place', 'cad', 'llc', 'owner', 'owner_web', 'market',
+               'score', 'listings', 'taxes', 'rates')
+# stages that can return partial data, and the key describing what is missing
+_STAGE_COVERAGE = {'rates': 'rate_coverage', 'listings': 'listings_coverage'}
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON for large competitor lists
+    orjson = None
+
+
+class EvaluationError(Exception):
+    pass
+
+
+def _eval_stage(fn):
+    """Memoize a stage method (its result or the exception it raised) and time
+    it under its own name."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self):
+        if name in self._errors:
+            raise self._errors[name]
+        if name not in self._results:
+            with _stage(name):
+                try:
+                    self._results[name] = fn(self)
+                except Exception as e:
+                    self._errors[name] = e
+                    raise
+        return self._results[name]
+    return wrapper
+
+
+class Evaluation:
+    def __init__(self, addr_in, fac_in=''):
+        self.addr_in = (addr_in or '').strip()
+        self.fac_in = (fac_in or '').strip()
+        if not self.addr_in and not self.fac_in:
+            raise EvaluationError("Enter address or facility name.")
+        self._results = {}
+        self._errors = {}
+
+    @_eval_stage
+    def location(self):
+        geo = _get(
+            "https://maps.googleapis.com/maps/api/geocode/json",
+            params={'address': self.fac_in or self.addr_in, 'key': GOOGLE_API_KEY}
+        ).json()
+        if geo.get('status') != 'OK':
+            raise EvaluationError("Geocode error: " + geo.get('status', ''))
+        r0    = geo['results'][0]
+        comps = r0['address_components']
+        loc = {
+            'address': r0['formatted_address'],
+            'lat': r0['geometry']['location']['lat'],
+            'lng': r0['geometry']['location']['lng'],
+            'county': next((c['long_name'].replace(' County', '')
+                            for c in comps if 'administrative_area_level_2' in c['types']), 'Unknown'),
+            'state': next((c['short_name']
+                           for c in comps if 'administrative_area_level_1' in c['types']), ''),
+        }
+        st = _stats()
+        if st is not None:
+            st.meta.update({'address': loc['address'], 'county': loc['county'], 'state': loc['state']})
+        return loc
+
+    @_eval_stage
+    def place(self):
+        fp = _get(
+            "https://maps.googleapis.com/maps/api/place/findplacefromtext/json",
+            params={
+                'input': self.fac_in or f"self storage near {self.location()['address']}",
+                'inputtype': 'textquery',
+                'fields': 'place_id',
+                'key': GOOGLE_API_KEY
+            }
+        ).json()
+        if not fp.get('candidates'):
+            return {}
+        return _get(
+            "https://maps.googleapis.com/maps/api/place/details/json",
+            params={
+                'place_id': fp['candidates'][0]['place_id'],
+                'fields': 'place_id,name,formatted_phone_number,website,rating,user_ratings_total,opening_hours,reviews,formatted_address',
+                'key': GOOGLE_API_KEY
+            }
+        ).json().get('result', {})
+
+    @_eval_stage
+    def cad(self):
+        loc = self.location()
+        return get_cad_details(loc['county'], loc['state'], loc['address'])
+
+    @_eval_stage
+    def llc(self):
+        return get_llc_info(self.cad().get('owner_name', ''))
+
+    @_eval_stage
+    def owner(self):
+        return get_owner_profile(self.llc().get('llc_name', ''))
+
+    @_eval_stage
+    def owner_web(self):
+        return search_owner_online(self.cad().get('owner_name', '') or self.addr_in, self.location()['address'])
+
+    @_eval_stage
+    def market(self):
+        loc = self.location()
+        return get_market_comps(loc['lat'], loc['lng'])
+
+    @_eval_stage
+    def score(self):
+        # Deal score stub (unchanged)
+        ask, inc, exp, nrsf = 1_200_000, 15_000, 5_000, 20_000
+        noi  = (inc - exp) * 12
+        cap  = round(noi / ask * 100, 2)
+        ppsf = round(ask / nrsf, 2)
+        sv   = (cap >= 7) + (ppsf < 75) + (ask < (noi / 0.07))
+        return {'cap': cap, 'ppsf': ppsf, 'nrsf': nrsf,
+                'score': ['Pass', 'Weak', 'Explore', 'Strong'][min(3, sv)]}
+
+    @_eval_stage
+    def listings(self):
+        loc = self.location()
+        nrsf = self.score()['nrsf']
+        listings, coverage = _listings_within(loc['lat'], loc['lng'], LISTINGS_RADIUS_MI)
+        avg_ppsf, rec_value = summarize_listings(listings, nrsf)
+        return {'listings': listings, 'recommended_ppsf': avg_ppsf, 'recommended_value': rec_value,
+                'listings_coverage': coverage}
+
+    @_eval_stage
+    def taxes(self):
+        loc = self.location()
+        taxes = get_tax_history(loc['address'], loc['county'])
+        avg_tax = round(sum(r['tax'] for r in taxes) / len(taxes), 2) if taxes else 0
+        return {'tax_records': taxes, 'avg_tax': avg_tax}
+
+    @_eval_stage
+    def rates(self):
+        loc, place = self.location(), self.place()
+        subj_rates, comp_rates, summary, extras = build_rate_analysis(
+            place or {}, self.market(), origin=(loc['lat'], loc['lng']))
+        with _stage('rate_history'):
+            record_rate_history(dict(place or {}, website=extras['subject_website']), subj_rates,
+                                comp_rates + extras['competitor_rates_10'],
+                                loc['lat'], loc['lng'], loc['county'], loc['state'])
+        return {'subject_rates': subj_rates, 'competitor_rates': comp_rates, 'rate_analysis': summary, **extras}
+
+    def run(self, stages=EVAL_STAGES, sla_sec=None):
+        """Compute the requested stages (in pipeline order) within the SLA and
+        return their `data` fields. Stages that fail or run out of time are
+        left out and listed in data['incomplete'] as {stage: reason}."""
+        token = _DEADLINE.set(time.monotonic() + (EVAL_SLA_SEC if sla_sec is None else sla_sec))
+        try:
+            data = dict(self.location())
+            incomplete = {}
+            for name in EVAL_STAGES:
+                if name not in stages or name == 'location':
+                    continue
+                try:
+                    if name not in ('score', 'owner'):  # local-only stages always run
+                        _budget(None)
+                    out = getattr(self, name)()
+                except DeadlineExceeded:
+                    incomplete[name] = 'deadline'
+                    continue
+                except Exception:
+                    incomplete[name] = 'error'
+                    continue
+                if name in ('score', 'listings', 'taxes', 'rates'):
+                    data.update(out)
+                else:
+                    data[name] = out
+                cov = out.get(_STAGE_COVERAGE[name], {}) if name in _STAGE_COVERAGE else {}
+                if cov.get('pending') or cov.get('subject_pending'):
+                    incomplete[name] = 'partial'
+        finally:
+            _DEADLINE.reset(token)
+        st = _stats()
+        data['incomplete'] = incomplete
+        data['data_age'] = {k: round(v) for k, v in (st.data_age if st is not None else {}).items()}
+        if st is not None and incomplete:
+            st.meta['incomplete'] = incomplete
+        return data
+
+
+def _json_response(payload, status=200):
+    if orjson is not None:
+        body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(payload, separators=(',', ':'), default=str)
+    return app.response_class(body, status=status, mimetype='application/json')
+
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     data = {
@@ -645,107 +2692,214 @@ def index():
         'cap': 0, 'ppsf': 0, 'score': '',
         'nrsf': 0, 'listings': [], 'recommended_ppsf': 0,
         'recommended_value': 0, 'tax_records': [], 'avg_tax': 0,
-        'subject_rates': {}, 'competitor_rates': [], 'rate_analysis': {}
+        'subject_rates': {}, 'competitor_rates': [], 'rate_analysis': {},
+        'competitor_rates_10': [], 'rate_analysis_10': {}, 'rate_coverage': {}, 'listings_coverage': {},
+        'data_age': {}, 'incomplete': {}
     }
     error = None
 
     if request.method == 'POST':
-        addr_in = request.form.get('query', '').strip()
-        fac_in  = request.form.get('facility', '').strip()
-        if not addr_in and not fac_in:
-            error = "Enter address or facility name."
-        else:
-            q   = fac_in or addr_in
-            geo = requests.get(
-                "https://maps.googleapis.com/maps/api/geocode/json",
-                params={'address': q, 'key': GOOGLE_API_KEY}
-            ).json()
-
-            if geo.get('status') != 'OK':
-                error = "Geocode error: " + geo.get('status', '')
-            else:
-                r0    = geo['results'][0]
-                addr  = r0['formatted_address']
-                lat   = r0['geometry']['location']['lat']
-                lng   = r0['geometry']['location']['lng']
-                comps = r0['address_components']
-                county = next((c['long_name'].replace(' County','')
-                               for c in comps if 'administrative_area_level_2' in c['types']), 'Unknown')
-                state  = next((c['short_name']
-                               for c in comps if 'administrative_area_level_1' in c['types']), '')
-
-                fp = requests.get(
-                    "https://maps.googleapis.com/maps/api/place/findplacefromtext/json",
-                    params={
-                        'input': fac_in or f"self storage near {addr}",
-                        'inputtype': 'textquery',
-                        'fields': 'place_id',
-                        'key': GOOGLE_API_KEY
-                    }
-                ).json()
-
-                place = {}
-                if fp.get('candidates'):
-                    pid = fp['candidates'][0]['place_id']
-                    place = requests.get(
-                        "https://maps.googleapis.com/maps/api/place/details/json",
-                        params={
-                            'place_id': pid,
-                            'fields': 'name,formatted_phone_number,website,rating,user_ratings_total,opening_hours,reviews,formatted_address',
-                            'key': GOOGLE_API_KEY
-                        }
-                    ).json().get('result', {})
-
-                cad       = get_cad_details(county, state, addr)
-                llc       = get_llc_info(cad.get('owner_name', ''))
-                owner     = get_owner_profile(llc.get('llc_name', ''))
-                owner_web = search_owner_online(cad.get('owner_name', '') or addr_in, addr)
-                market    = get_market_comps(lat, lng)
-
-                # Deal score stub (unchanged)
-                ask, inc, exp, nrsf = 1_200_000, 15_000, 5_000, 20_000
-                noi  = (inc - exp) * 12
-                cap  = round(noi / ask * 100, 2)
-                ppsf = round(ask / nrsf, 2)
-                sv   = (cap >= 7) + (ppsf < 75) + (ask < (noi / 0.07))
-                score = ['Pass', 'Weak', 'Explore', 'Strong'][min(3, sv)]
-
-                listings  = get_surrounding_listings(lat, lng)
-                avg_ppsf  = round(sum(l['ppsf'] for l in listings) / len(listings), 2) if listings else 0
-                rec_value = round(avg_ppsf * nrsf, 2) if listings else 0
-                taxes     = get_tax_history(addr)
-                avg_tax   = round(sum(r['tax'] for r in taxes) / len(taxes), 2) if taxes else 0
-
-                # NEW: subject + competitors standard rate analysis
-                subj_rates, comp_rates, summary = build_rate_analysis(place or {}, market)
-
-                data.update({
-                    'address': addr,
-                    'lat': lat,
-                    'lng': lng,
-                    'county': county,
-                    'state': state,
-                    'place': place,
-                    'cad': cad,
-                    'llc': llc,
-                    'owner': owner,
-                    'owner_web': owner_web,
-                    'market': market,
-                    'cap': cap,
-                    'ppsf': ppsf,
-                    'score': score,
-                    'nrsf': nrsf,
-                    'listings': listings,
-                    'recommended_ppsf': avg_ppsf,
-                    'recommended_value': rec_value,
-                    'tax_records': taxes,
-                    'avg_tax': avg_tax,
-                    'subject_rates': subj_rates,
-                    'competitor_rates': comp_rates,
-                    'rate_analysis': summary
-                })
+        try:
+            data.update(Evaluation(request.form.get('query', ''), request.form.get('facility', '')).run())
+        except (EvaluationError, DeadlineExceeded) as e:
+            error = str(e)
 
     return render_template('index.html', data=data, error=error, google_api_key=GOOGLE_API_KEY)
 
+
+@app.route('/api/evaluate', methods=['GET', 'POST'])
+def evaluate_api():
+    """JSON evaluation. Params: query, facility, stages=market,rates (default: all),
+    sla_sec (at most EVAL_SLA_SEC)."""
+    args = request.get_json(silent=True)
+    if args is None:
+        args = request.values
+    elif not isinstance(args, dict):
+        return _json_response({'error': 'JSON body must be an object'}, 400)
+    raw = args.get('stages') or ''
+    items = raw if isinstance(raw, list) else raw.split(',') if isinstance(raw, str) else None
+    if items is None or not all(isinstance(x, str) for x in items):
+        return _json_response({'error': 'stages must be a comma-separated string or a list of names',
+                               'stages': list(EVAL_STAGES)}, 400)
+    stages = [x.strip() for x in items if x.strip()] or list(EVAL_STAGES)
+    unknown = [x for x in stages if x not in EVAL_STAGES]
+    if unknown:
+        return _json_response({'error': f"Unknown stages: {', '.join(unknown)}", 'stages': list(EVAL_STAGES)}, 400)
+    raw_sla = args.get('sla_sec')
+    try:
+        sla = EVAL_SLA_SEC if raw_sla in (None, '') else float(raw_sla)
+    except (TypeError, ValueError):
+        sla = None
+    if sla is None or isinstance(raw_sla, bool) or not 0 < sla < float('inf'):
+        return _json_response({'error': 'sla_sec must be a positive number'}, 400)
+    sla = min(sla, EVAL_SLA_SEC)
+    if not all(isinstance(args.get(k) or '', str) for k in ('query', 'facility')):
+        return _json_response({'error': 'query and facility must be strings'}, 400)
+    try:
+        data = Evaluation(args.get('query', ''), args.get('facility', '')).run(stages, sla_sec=sla)
+    except (EvaluationError, DeadlineExceeded) as e:
+        return _json_response({'error': str(e)}, 400)
+    return _json_response({'stages': stages, 'data': data})
+
+
+# =====================================
+# 8) CLI commands (flask --app app <cmd>)
+# =====================================
+@app.cli.command("cad-ingest")
+@click.argument("county")
+@click.argument("year", type=int)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--delimiter", default=None, help="Override the layout's field delimiter.")
+@click.option("--map", "mapping", multiple=True, metavar="FIELD=COL[+COL]",
+              help="Override a layout field, e.g. --map situs=SITUS_NUM+SITUS_STREET.")
+@click.option("--force", is_flag=True, help="Reload even if the file is unchanged.")
+def cad_ingest_command(county, year, path, delimiter, mapping, force):
+    """Load a certified-roll export for COUNTY / YEAR into the local store."""
+    layout = {}
+    if delimiter:
+        layout['delimiter'] = delimiter.encode().decode('unicode_escape')
+    for m in mapping:
+        field, _, cols = m.partition('=')
+        layout[field.strip()] = tuple(c.strip() for c in cols.split('+') if c.strip())
+    t0 = time.time()
+    n = ingest_cad_roll(county, year, path, layout=layout, force=force)
+    if n:
+        click.echo(f"Loaded {n} {county} {year} rows in {time.time() - t0:.1f}s")
+    else:
+        click.echo(f"{county} {year}: file unchanged, skipped (use --force to reload)")
+
+
+def _parse_window(ctx, param, value):
+    """click callback: 'H1-H2' -> (H1, H2) with hours in 0-24."""
+    if not value:
+        return None
+    try:
+        a, b = (int(x) for x in value.split('-'))
+    except ValueError:
+        raise click.BadParameter("expected H1-H2, e.g. 22-6")
+    if not (0 <= a <= 24 and 0 <= b <= 24):
+        raise click.BadParameter("hours must be between 0 and 24")
+    return a, b
+
+
+def _in_window(window, hour):
+    """True if hour falls in an (H1, H2) window (may wrap midnight); always True without one."""
+    if not window:
+        return True
+    a, b = window
+    return a <= hour < b if a <= b else (hour >= a or hour < b)
+
+
+@app.cli.command("prewarm")
+@click.argument("watchlist", type=click.Path(exists=True, dir_okay=False))
+@click.option("--concurrency", default=4, show_default=True, help="Facilities warmed in parallel.")
+@click.option("--max-google-calls", type=int, default=None, help="Stop after this many billed Maps calls per sweep.")
+@click.option("--max-renders", type=int, default=None, help="Stop after this many headless Chrome renders per sweep.")
+@click.option("--max-age-hours", type=float, default=CACHE_TTL_SEC / 7200, show_default=True,
+              help="Re-scrape entries older than this.")
+@click.option("--every-hours", type=float, default=None, help="Keep running and sweep on this interval.")
+@click.option("--window", default=None, metavar="H1-H2", callback=_parse_window,
+              help="Only sweep between these local hours, e.g. 22-6.")
+def prewarm_command(watchlist, concurrency, max_google_calls, max_renders, max_age_hours, every_hours, window):
+    """Warm the rate/website caches for every facility in WATCHLIST (JSON)."""
+    while True:
+        if _in_window(window, datetime.now().hour):
+            try:
+                res = prewarm_watchlist(load_watchlist(watchlist), concurrency=concurrency,
+                                        max_google_calls=max_google_calls, max_renders=max_renders,
+                                        max_age_sec=max_age_hours * 3600)
+                click.echo(json.dumps(res))
+            except Exception as e:
+                if not every_hours:
+                    raise
+                click.echo(f"prewarm sweep failed: {e}", err=True)  # keep the schedule running
+        if not every_hours:
+            break
+        time.sleep(every_hours * 3600)
+
+
+@app.cli.command("reparse-snapshots")
+@click.option("--workers", type=int, default=None, help="Parser processes (default: all cores).")
+@click.option("--since-days", type=float, default=None, help="Only pages archived in the last N days.")
+def reparse_snapshots_command(workers, since_days):
+    """Rebuild cached rate results from the page archive with the current parsers."""
+    t0 = time.time()
+    since = time.time() - since_days * 86400 if since_days else None
+    sites, pages = reparse_snapshots(workers=workers, since=since)
+    click.echo(f"Re-parsed {pages} pages for {sites} sites in {time.time() - t0:.1f}s")
+
+
+@app.cli.command("compact-rate-history")
+def compact_rate_history_command():
+    """Merge each past day's rate-history files into one."""
+    parts, files = compact_rate_history()
+    click.echo(f"Compacted {files} files into {parts} partitions")
+
+
+def summarize_request_log(path=REQUEST_LOG_PATH, top=10):
+    """Aggregate the request log by market and by stage; returns a dict of sorted rows."""
+    markets = defaultdict(lambda: {'requests': 0, 'total_sec': 0.0, 'bytes': 0, 'google_calls': 0,
+                                   'chrome_launches': 0, 'render_sec': 0.0, 'parse_cpu_sec': 0.0})
+    stages = defaultdict(list)
+    hosts = Counter()
+    google = Counter()
+    n = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            n += 1
+            m = markets[f"{rec.get('county') or '?'}, {rec.get('state') or '?'}"]
+            m['requests'] += 1
+            m['total_sec'] += rec.get('total_sec', 0)
+            m['bytes'] += rec.get('bytes', 0)
+            m['google_calls'] += rec.get('google_calls_total', 0)
+            m['chrome_launches'] += rec.get('chrome_launches', 0)
+            m['render_sec'] += rec.get('render_sec', 0)
+            m['parse_cpu_sec'] += rec.get('parse_cpu_sec', 0)
+            for k, v in (rec.get('stages') or {}).items():
+                stages[k].append(v)
+            hosts.update(rec.get('calls') or {})
+            google.update(rec.get('google_calls') or {})
+
+    def pct(xs, q):
+        xs = sorted(xs)
+        return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0
+
+    stage_rows = sorted(({'stage': k, 'total_sec': round(sum(v), 2), 'avg_sec': round(sum(v) / len(v), 3),
+                          'p95_sec': round(pct(v, 0.95), 3)} for k, v in stages.items()),
+                        key=lambda r: r['total_sec'], reverse=True)
+    market_rows = sorted(({'market': k, **{f: (round(v, 2) if isinstance(v, float) else v) for f, v in m.items()}}
+                          for k, m in markets.items()),
+                         key=lambda r: r['total_sec'], reverse=True)
+    return {
+        'requests': n,
+        'markets': market_rows[:top],
+        'stages': stage_rows,
+        'hosts': hosts.most_common(top),
+        'google_calls': google.most_common(),
+    }
+
+
+@app.cli.command("request-log-summary")
+@click.option("--path", default=REQUEST_LOG_PATH, show_default=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--top", default=10, show_default=True, help="Rows per table.")
+def request_log_summary_command(path, top):
+    """Report the most expensive markets, stages and upstream hosts."""
+    rep = summarize_request_log(path, top)
+    click.echo(f"{rep['requests']} requests\n")
+    click.echo(f"{'market':<28}{'reqs':>6}{'sec':>10}{'MB':>9}{'google':>8}{'chrome':>8}{'render s':>10}{'parse s':>9}")
+    for m in rep['markets']:
+        click.echo(f"{m['market'][:27]:<28}{m['requests']:>6}{m['total_sec']:>10.1f}{m['bytes'] / 1e6:>9.1f}"
+                   f"{m['google_calls']:>8}{m['chrome_launches']:>8}{m['render_sec']:>10.1f}{m['parse_cpu_sec']:>9.1f}")
+    click.echo(f"\n{'stage':<16}{'total s':>10}{'avg s':>9}{'p95 s':>9}")
+    for r in rep['stages']:
+        click.echo(f"{r['stage']:<16}{r['total_sec']:>10.1f}{r['avg_sec']:>9.2f}{r['p95_sec']:>9.2f}")
+    click.echo("\nupstream calls: " + ", ".join(f"{h} {c}" for h, c in rep['hosts']))
+    click.echo("google billed:  " + ", ".join(f"{k} {c}" for k, c in rep['google_calls']))
+
+
 if __name__ == '__main__':
     app.run(debug=True)
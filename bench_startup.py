@@ -0,0 +1,46 @@
+"""Startup benchmark: import time, pre-fork warm-up time and memory.
+
+Each run imports `app` in a fresh interpreter. Usage:
+
+    python bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = sorted(m for m in ('bs4', 'googlesearch', 'selenium', 'pyarrow') if m in sys.modules)
+warm = app.warm_shared_state()
+print(json.dumps({
+    'import_sec': t1 - t0,
+    'warm_sec': warm,
+    'rss_import_kb': rss_import,
+    'rss_warm_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_at_import': heavy,
+}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    for key in ('import_sec', 'warm_sec', 'rss_import_kb', 'rss_warm_kb'):
+        vals = [r[key] for r in runs]
+        print(f"{key:<14} median {statistics.median(vals):>10.3f}   min {min(vals):>10.3f}   max {max(vals):>10.3f}")
+    print(f"{'heavy modules loaded at import':<14}: {', '.join(runs[-1]['heavy_at_import']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import os
+
+# Load the app once in the master and fork workers from it, so imported
+# modules and read-only tables are shared copy-on-write.
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+timeout = 180
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before workers fork.
+    import app
+    secs = app.warm_shared_state()
+    server.log.info("Shared state warmed in %.2fs", secs)
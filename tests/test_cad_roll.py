@@ -0,0 +1,27 @@
+import app
+
+
+def _load(tmp_path, monkeypatch, rows):
+    path = tmp_path / "roll.csv"
+    path.write_text("prop_id,py_owner_name,situs_num,situs_street\n"
+                    + "".join(f"{a},{o},{n},{s}\n" for a, o, n, s in rows))
+    monkeypatch.setattr(app, "CAD_DB_PATH", str(tmp_path / "roll.sqlite"))
+    monkeypatch.setattr(app, "_cad_local", app.threading.local())
+    app.ingest_cad_roll("travis", 2024, str(path))
+
+
+def test_roll_match_requires_same_number_and_street(tmp_path, monkeypatch):
+    _load(tmp_path, monkeypatch, [("1", "ALICE LLC", "200", "MAIN ST 100"),
+                                  ("2", "BOB LLC", "100", "N LAMAR BLVD")])
+    assert app.cad_roll_lookup("Travis", "100 Main St, Austin, TX") == {}
+    assert app.cad_roll_lookup("Travis", "100 N Main St, Austin, TX") == {}
+    assert app.cad_roll_lookup("Travis", "100 North Lamar Boulevard, Austin, TX")["owner_name"] == "BOB LLC"
+
+
+def test_roll_match_prefix_and_ambiguity(tmp_path, monkeypatch):
+    _load(tmp_path, monkeypatch, [("1", "ALICE LLC", "100", "MAIN ST"),
+                                  ("2", "CAROL LLC", "300", "ELM ST 1"),
+                                  ("3", "DAVE LLC", "300", "ELM ST 2")])
+    assert app.cad_roll_lookup("travis", "100 Main Street Ste 5")["owner_name"] == "ALICE LLC"
+    assert app.cad_roll_lookup("travis", "300 Elm St 2")["owner_name"] == "DAVE LLC"
+    assert app.cad_roll_lookup("travis", "300 Elm St") == {}
@@ -0,0 +1,25 @@
+import app
+
+
+def _company(name, number):
+    return {'name': name, 'company_number': number, 'jurisdiction_code': 'us_tx',
+            'incorporation_date': '2020-01-01', 'opencorporates_url': f'https://oc/{number}'}
+
+
+def test_numbered_sibling_is_not_a_local_hit(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "ENTITY_DB_PATH", str(tmp_path / "entities.sqlite"))
+    monkeypatch.setattr(app, "_entity_local", app.threading.local())
+    searched = []
+
+    def fetch(name):
+        searched.append(name)
+        return {'ABC Storage Fund III LLC': [_company('ABC STORAGE FUND III LLC', '3')],
+                'ABC Storage Fund II LLC': [_company('ABC STORAGE FUND II LLC', '2')]}.get(name, [])
+    monkeypatch.setattr(app, "_fetch_companies", fetch)
+
+    assert app.get_llc_info('ABC Storage Fund III LLC')['llc_name'] == 'ABC STORAGE FUND III LLC'
+    assert app.get_llc_info('ABC Storage Fund II LLC')['llc_name'] == 'ABC STORAGE FUND II LLC'
+    assert searched == ['ABC Storage Fund III LLC', 'ABC Storage Fund II LLC']
+    # same numbers: answered from the index without another search
+    assert app.get_llc_info('ABC Storage Fund II, L.L.C.')['llc_name'] == 'ABC STORAGE FUND II LLC'
+    assert len(searched) == 2
@@ -0,0 +1,38 @@
+import app
+
+
+def test_geohash_center_round_trip():
+    gh = app._geohash(32.7767, -96.7970, 6)
+    lat, lng = app._geohash_center(gh)
+    h, w = app._geohash_cell(6)
+    assert abs(lat - 32.7767) <= h / 2 and abs(lng + 96.7970) <= w / 2
+    assert app._geohash(lat, lng, 6) == gh
+
+
+def test_covering_tiles_cover_the_radius():
+    lat, lng, r = 32.7767, -96.7970, 5
+    tiles = set(app._covering_tiles(lat, lng, r))
+    for dlat, dlng in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        p = (lat + dlat * r / 69.0, lng + dlng * r / (69.0 * app.math.cos(app.math.radians(lat))))
+        assert app._geohash(*p, app.LISTINGS_TILE_PRECISION) in tiles
+
+
+def _listing(source, name, address, lat, lng, link):
+    return {'source': source, 'name': name, 'nrsf': 10000.0, 'price': 1_000_000.0, 'ppsf': 100.0,
+            'link': link, 'address': address, 'lat': lat, 'lng': lng}
+
+
+def test_listings_filtered_by_distance_and_deduped_by_address(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "LISTINGS_DB_PATH", str(tmp_path / "listings.sqlite"))
+    monkeypatch.setattr(app, "_listings_local", app.threading.local())
+    lat, lng = 32.7767, -96.7970
+    crexi = [_listing('Crexi', 'Self Storage', '100 Main Street, Dallas, TX', lat + 0.01, lng, '/a'),
+             _listing('Crexi', 'Self Storage', '900 Elm St, Dallas, TX', lat + 0.02, lng, '/b'),
+             _listing('Crexi', 'Far Away Storage', '1 Far Rd, Dallas, TX', lat + 0.3, lng, '/c')]
+    loopnet = [_listing('LoopNet', 'Main St Storage Portfolio', '100 Main St, Dallas, TX', None, None, '/d')]
+    monkeypatch.setattr(app, "scrape_crexi", lambda *a: [dict(l) for l in crexi])
+    monkeypatch.setattr(app, "scrape_loopnet", lambda *a: [dict(l) for l in loopnet])
+    monkeypatch.setattr(app, "_geocode_listing", lambda address: (lat + 0.01, lng))
+
+    got = app.get_surrounding_listings(lat, lng, radius_mi=5)
+    assert sorted(l['address'] for l in got) == ['100 Main Street, Dallas, TX', '900 Elm St, Dallas, TX']